@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------------
+# Mission:  将页面缓存 (cache/*.html) 与解析后的数据文件打包为单个压缩归档，
+#           用于新环境冷启动预热、CI 以及离线复现某一天的报告。
+#
+#  归档格式: 标准 zip (自带中央目录索引，可按成员随机读取)
+#     manifest.json          -> 创建时间、成员列表
+#     cache/<基金代码>.html  -> 页面缓存
+#     nav_history/<基金代码>.tsv -> 净值历史 (见 nav_history.py)
+#     data/<文件名>          -> 各指数的 source_file / target_file / digest_file
+#
+#  如何使用:
+#     python cache_snapshot.py export snapshot.zip
+#     python cache_snapshot.py import snapshot.zip                 # 恢复页面缓存与净值历史
+#     python cache_snapshot.py import snapshot.zip --with-data     # 同时恢复数据文件
+#     python run_all.py --snapshot snapshot.zip                    # 不解压，按需读取 (过期页面也不访问网络)
+#
+#  恢复的页面保留打包时的修改时间，即页面真实的抓取时间，数据年龄 (staleness.py) 因此保持准确；
+#  超过有效期的页面在普通运行中会重新抓取。需要离线复现时使用 --snapshot，而不是改写修改时间。
+# -------------------------------------------------------------------------
+import argparse
+import json
+import mmap
+import os
+import time
+import zipfile
+from config import CONFIGS
+from nav_history import NAV_HISTORY_DIR
+
+CACHE_DIR = "cache"
+MANIFEST_NAME = "manifest.json"
+
+
+def _data_files(configs: dict) -> list:
+    files = []
+    for config in configs.values():
+        for key in ("source_file", "target_file", "digest_file"):
+            if config.get(key) and config[key] not in files:
+                files.append(config[key])
+    return files
+
+
+def export_snapshot(archive_path: str, configs: dict = None, cache_dir: str = CACHE_DIR) -> int:
+    """将页面缓存和数据文件写入 archive_path，返回写入的成员数量。"""
+    configs = configs if configs is not None else CONFIGS
+    members = []
+    tmp_path = archive_path + ".tmp"
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+        if os.path.isdir(cache_dir):
+            for name in sorted(os.listdir(cache_dir)):
+                if name.endswith(".html"):
+                    zf.write(os.path.join(cache_dir, name), f"cache/{name}")
+                    members.append(f"cache/{name}")
+        if os.path.isdir(NAV_HISTORY_DIR):
+            for name in sorted(os.listdir(NAV_HISTORY_DIR)):
+                if name.endswith(".tsv"):
+                    zf.write(os.path.join(NAV_HISTORY_DIR, name), f"nav_history/{name}")
+                    members.append(f"nav_history/{name}")
+        for path in _data_files(configs):
+            if os.path.exists(path):
+                zf.write(path, f"data/{os.path.basename(path)}")
+                members.append(f"data/{os.path.basename(path)}")
+        manifest = {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "members": members}
+        zf.writestr(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2))
+    os.replace(tmp_path, archive_path)
+    return len(members)
+
+
+class _MappedArchive(mmap.mmap):
+    """zipfile 需要 seekable()，而 mmap 在 Python 3.13 之前没有这个方法。"""
+
+    def seekable(self):
+        return True
+
+
+class Snapshot:
+    """
+    只读快照。归档通过 mmap 映射，成员在首次访问时才解压，
+    因此打开一个包含数千页面的快照几乎没有开销。
+    """
+
+    def __init__(self, archive_path: str):
+        self.archive_path = archive_path
+        self._file = open(archive_path, "rb")
+        try:
+            self._map = _MappedArchive(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._zip = zipfile.ZipFile(self._map)
+        except (ValueError, OSError):
+            # 空文件或不支持 mmap 的文件系统，退回普通文件读取
+            self._map = None
+            self._zip = zipfile.ZipFile(self._file)
+        self._names = set(self._zip.namelist())
+
+    def manifest(self) -> dict:
+        return json.loads(self._zip.read(MANIFEST_NAME).decode("utf-8"))
+
+    def read_page(self, fund_code: str):
+        """返回基金页面HTML，快照中不存在时返回 None。"""
+        name = f"cache/{fund_code}.html"
+        if name not in self._names:
+            return None
+        return self._zip.read(name).decode("utf-8")
+
+    def page_time(self, fund_code: str):
+        """返回页面打包时的修改时间 (时间戳)，快照中不存在时返回 None。"""
+        name = f"cache/{fund_code}.html"
+        if name not in self._names:
+            return None
+        return time.mktime(self._zip.getinfo(name).date_time + (0, 0, -1))
+
+    def restore(self, cache_dir: str = CACHE_DIR, with_data: bool = False) -> int:
+        """
+        解压到磁盘，返回恢复的文件数量。
+        页面缓存的修改时间设为打包时的时间 (缓存过期判断与 scraper 的“抓取时间”都以它为准)；
+        数据文件以恢复时刻为修改时间，视为一次新的编辑 (见 fund_store.ensure_store)。
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        restored = 0
+        for info in self._zip.infolist():
+            if info.filename.startswith("cache/"):
+                target = os.path.join(cache_dir, os.path.basename(info.filename))
+            elif info.filename.startswith("nav_history/"):
+                os.makedirs(NAV_HISTORY_DIR, exist_ok=True)
+                target = os.path.join(NAV_HISTORY_DIR, os.path.basename(info.filename))
+            elif with_data and info.filename.startswith("data/"):
+                target = os.path.basename(info.filename)
+            else:
+                continue
+            with open(target, "wb") as f:
+                f.write(self._zip.read(info))
+            if info.filename.startswith("cache/"):
+                mtime = time.mktime(info.date_time + (0, 0, -1))
+                os.utime(target, (mtime, mtime))
+            restored += 1
+        return restored
+
+    def restore_nav_history(self) -> int:
+        """只恢复本地缺失的净值历史文件 (用于挂载快照时的 --nav-history 复现)。"""
+        restored = 0
+        for info in self._zip.infolist():
+            if not info.filename.startswith("nav_history/"):
+                continue
+            os.makedirs(NAV_HISTORY_DIR, exist_ok=True)
+            target = os.path.join(NAV_HISTORY_DIR, os.path.basename(info.filename))
+            if os.path.exists(target):
+                continue
+            with open(target, "wb") as f:
+                f.write(self._zip.read(info))
+            restored += 1
+        return restored
+
+    def close(self):
+        self._zip.close()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="页面缓存快照的导出与导入。")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="打包当前缓存与数据文件。")
+    export_parser.add_argument("archive", type=str)
+    import_parser = subparsers.add_parser("import", help="从快照恢复缓存。")
+    import_parser.add_argument("archive", type=str)
+    import_parser.add_argument("--with-data", action="store_true",
+                               help="同时恢复 source_file / target_file / digest_file (会覆盖现有文件)。")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        count = export_snapshot(args.archive)
+        print(f"已将 {count} 个文件打包到 '{args.archive}'。")
+    else:
+        with Snapshot(args.archive) as snapshot:
+            print(f"快照创建于 {snapshot.manifest()['created_at']}")
+            count = snapshot.restore(with_data=args.with_data)
+        print(f"已从 '{args.archive}' 恢复 {count} 个文件。")
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------------
+# Mission:  比对本次抓取结果与上一次快照，输出变化超过阈值的基金 (JSON Lines)。
+#           只保存每只基金的摘要 (哈希 + 关键数值)，不重新读取、比对整份TSV。
+# -------------------------------------------------------------------------
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+from config import CONFIGS, CHANGE_FEED_THRESHOLDS
+
+# 参与比对的字段: (变更字段名, 抓取记录中的来源列)
+TRACKED_FIELDS = [
+    ("近一年", "近一年"),
+    ("近三年", "近三年"),
+    ("规模", "规模及日期"),
+    ("跟踪误差", "跟踪信息"),
+]
+
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+_TRACKING_ERROR_RE = re.compile(r"跟踪误差：\s*(-?\d+(?:\.\d+)?)")
+
+
+def _to_number(field: str, raw: str):
+    """将抓取到的原始字符串 (如 '31.39%'、'26.94亿元（2025-06-30）') 转为数值，无法识别时返回 None。"""
+    if not raw:
+        return None
+    if field == "跟踪误差":
+        match = _TRACKING_ERROR_RE.search(raw)
+    else:
+        match = _NUMBER_RE.search(raw)
+    return float(match.group(1 if field == "跟踪误差" else 0)) if match else None
+
+
+def _make_digest(values: dict) -> dict:
+    payload = json.dumps(values, sort_keys=True, ensure_ascii=False)
+    return {"hash": hashlib.sha1(payload.encode("utf-8")).hexdigest(), "values": values}
+
+
+def fund_digest(record: dict) -> dict:
+    """为单只基金生成摘要: 关键字段的数值以及它们的哈希。"""
+    return _make_digest({field: _to_number(field, record.get(column, "")) for field, column in TRACKED_FIELDS})
+
+
+def advance_digest(previous: dict, current: dict, changes: dict) -> dict:
+    """
+    只把已报告的字段推进到新值，其余字段保留旧基准，避免缓慢漂移被一并吞掉。
+    新基金 (previous 为 None) 以当前值整体作为基准。
+    """
+    if previous is None:
+        return current
+    values = dict(previous["values"])
+    for field in changes:
+        values[field] = current["values"][field]
+    return _make_digest(values)
+
+
+def load_digests(digest_file: str) -> dict:
+    if not os.path.exists(digest_file):
+        return {}
+    with open(digest_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_digests(digest_file: str, digests: dict):
+    tmp_file = digest_file + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(digests, f, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_file, digest_file)
+
+
+def diff_digest(previous: dict, current: dict, thresholds: dict) -> dict:
+    """
+    返回超过阈值的字段变化 {字段: {"old", "new", "delta"}}；哈希一致时直接返回空。
+    本次无法解析 (new 为 None) 的字段视为解析异常，不报告也不推进基准；
+    只有从无到有 (old 为 None) 的字段才以 delta=None 报告。
+    """
+    if previous and previous["hash"] == current["hash"]:
+        return {}
+    changes = {}
+    old_values = previous["values"] if previous else {}
+    for field, new in current["values"].items():
+        old = old_values.get(field)
+        if new is None:
+            continue
+        if old is None:
+            changes[field] = {"old": old, "new": new, "delta": None}
+            continue
+        delta = round(new - old, 4)
+        if abs(delta) >= thresholds.get(field, 0):
+            changes[field] = {"old": old, "new": new, "delta": delta}
+    return changes
+
+
+def change_feed_for_config(config: dict, records: list, thresholds: dict = None) -> list:
+    """
+    根据本次抓取记录与上一次的摘要生成变更流，追加写入 `change_feed_file`，并刷新 `digest_file`。
+    抓取失败的基金保留旧摘要；其余基金只推进已报告字段的基准值。
+    """
+    index_name = config["index_name"]
+    digest_file = config["digest_file"]
+    feed_file = config["change_feed_file"]
+    thresholds = thresholds if thresholds is not None else CHANGE_FEED_THRESHOLDS
+
+    print(f"--- 开始为 '{index_name}' 指数检测数据变化 ---")
+
+    digests = load_digests(digest_file)
+    run_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    events = []
+
+    for record in records:
+        fund_code = record["基金代码"]
+        if str(record.get("近一年", "")).startswith(("抓取失败", "网络错误")):
+            continue
+        current = fund_digest(record)
+        previous = digests.get(fund_code)
+        changes = diff_digest(previous, current, thresholds)
+        if not changes:
+            # 未超过阈值时保留旧摘要作为基准，避免缓慢漂移被逐次吞掉
+            continue
+        digests[fund_code] = advance_digest(previous, current, changes)
+        events.append({
+            "time": run_at,
+            "index": index_name,
+            "基金代码": fund_code,
+            "基金名称": record["基金名称"],
+            "new": previous is None,
+            "changes": changes,
+        })
+
+    if events:
+        with open(feed_file, "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        print(f"检测到 {len(events)} 只基金发生变化，已追加到 '{feed_file}'。")
+    else:
+        print("未检测到超过阈值的变化。")
+    save_digests(digest_file, digests)
+    return events
+
+
+if __name__ == '__main__':
+    # 单独运行时，从上一次抓取输出的 source_file 中读取记录
+    print("===== 执行全量变更检测任务 =====")
+    for config_name, config_data in CONFIGS.items():
+        with open(config_data["source_file"], "r", encoding="utf-8-sig", newline="") as f:
+            change_feed_for_config(config_data, list(csv.DictReader(f, delimiter="\t")))
+        print("-" * 50)
+    print("===== 所有变更检测任务已完成 =====")
@@ -1,32 +1,43 @@
+import csv
 import pandas as pd
-from config import CONFIGS
+from config import CONFIGS, iter_share_classes
 
-def combine_for_config(config: dict):
+def combine_for_config(config: dict, store=None, records: list = None, skip_failed: bool = False):
     """
     根据传入的配置对象，执行数据合并任务。
+    skip_failed 为 True 时 (stale-while-revalidate 模式)，抓取失败的行不参与合并，保留目标文件中的原值；
+    工作库路径始终跳过失败记录。
+    传入 store (fund_store.FundStore) 时，改为按基金代码 upsert 到工作库，再由工作库导出 target_file
+    (导出前先导入 target_file 中的手动编辑，见 combine_into_store)。
     """
+    if store is not None:
+        return combine_into_store(config, store, records)
+
     index_name = config["index_name"]
     source_file = config["source_file"]
     target_file = config["target_file"]
     output_file = config["target_file"] # 覆盖原目标文件
-    funds_details = config["funds_details"]
 
     # 从配置动态生成名称映射关系
     # 键 (key): 天天基金名称 (来自 scraped_... or source_file)
     # 值 (value): 支付宝名称 (来自 ..._fund_data or target_file)
-    fund_name_mapping = {tiantian: alipay for code, alipay, tiantian in funds_details}
+    fund_name_mapping = {tiantian: alipay for code, alipay, tiantian in iter_share_classes(config)}
 
     print(f"--- 开始为 '{index_name}' 指数执行数据合并 ---")
 
     try:
         source_df = pd.read_csv(source_file, sep='\t', encoding='utf-8')
-        target_df = pd.read_csv(target_file, sep='\t', encoding='utf-8')
+        # 按文本读取，追加新行时原有的整数列 (如限额) 不会因缺失值被转成浮点数
+        target_df = pd.read_csv(target_file, sep='\t', encoding='utf-8', dtype=str)
         print("步骤 1/4: 成功读取源文件和目标文件。")
 
         # 数据预处理
         # 1. 在源数据中创建映射列，作为后续匹配的“桥梁”
         source_df['target_name'] = source_df['基金名称'].map(fund_name_mapping)
         source_df_mapped = source_df.dropna(subset=['target_name'])
+        if skip_failed:
+            failed = source_df_mapped['近一年'].astype(str).str.startswith(("抓取失败", "网络错误"))
+            source_df_mapped = source_df_mapped[~failed]
         
         # 2. 准备用于更新的数据
         update_data = source_df_mapped[['target_name', '近一年', '近三年', '规模及日期']].copy()
@@ -43,6 +54,13 @@ def combine_for_config(config: dict):
 
         # 核心数据更新
         target_df.update(update_data)
+        # 配置中有、目标文件中还没有的基金 (如新配置的C类份额) 追加到末尾，手动字段留空，与工作库的行为一致
+        missing_names = [name for _, name, _ in iter_share_classes(config) if name not in target_df.index]
+        if missing_names:
+            new_rows = update_data.reindex(missing_names)
+            new_rows.index.name = '名称'
+            target_df = pd.concat([target_df, new_rows])
+            print(f"  - 已追加 {len(missing_names)} 只新配置的基金: {', '.join(missing_names)}")
         target_df.reset_index(inplace=True)
         print("步骤 3/4: 核心数据更新完成。")
         
@@ -58,6 +76,34 @@ def combine_for_config(config: dict):
     except Exception as e:
         print(f"执行过程中发生错误: {e}")
 
+def combine_into_store(config: dict, store, records: list = None):
+    """
+    将抓取记录按基金代码 upsert 到工作库，并导出 target_file。records 为空时从 source_file 读取。
+    """
+    index_name = config["index_name"]
+    print(f"--- 开始为 '{index_name}' 指数执行数据合并 (工作库) ---")
+
+    if records is None:
+        try:
+            with open(config["source_file"], "r", encoding="utf-8-sig", newline="") as f:
+                records = list(csv.DictReader(f, delimiter='\t'))
+        except FileNotFoundError as e:
+            print(f"错误：文件未找到 - {e}")
+            return
+
+    # target_file 在上次同步后被手动修改过时先导入，避免导出时覆盖手动编辑
+    if store.tsv_modified(config):
+        count = store.import_tsv(config)
+        print(f"'{config['target_file']}' 在上次同步后被修改，已重新导入 {count} 条记录。")
+
+    updated = store.upsert_dynamics(records)
+    print(f"已更新 {updated} 只基金的动态数据到 '{store.db_path}'。")
+
+    # 仍有读取方 (report_server、fund_query、cache_snapshot 等) 直接使用 target_file，导出以保持同步
+    exported = store.export_tsv(config)
+    print(f"已将 {exported} 条记录导出到 '{config['target_file']}'。")
+    print(f"\n--- '{index_name}' 指数合并任务执行完毕 ---")
+
 if __name__ == '__main__':
     print("===== 执行全量数据合并任务 =====")
     for config_name, config_data in CONFIGS.items():
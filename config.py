@@ -27,22 +27,56 @@ SP500_FUNDS = [
     ("096001", "大成标普500等权重指数(QDII)A", "大成标普500等权重指数(QDII)A人民币"),
 ]
 
+# --- 份额类别分组 ---
+# 键为 funds_details 中的主份额代码 (通常是A类)，值为同一基金的其他份额 (如C类)，元素结构与上面相同。
+# 抓取主份额页面时，如果页面中已包含兄弟份额的数据，则直接复用，只有缺失时才单独请求其页面。
+# 例: "017436": [("0xxxxx", "华宝纳斯达克精选股票(QDII)C", "华宝纳斯达克精选股票发起式(QDII)C")]
+NASDAQ_SHARE_CLASSES = {}
+SP500_SHARE_CLASSES = {}
+
+# --- 变更检测阈值 ---
+# 本次与上次抓取相比，变化绝对值达到阈值才写入变更流 (change_feed.py)
+# 近一年/近三年/跟踪误差 单位为百分点，规模 单位为亿元
+CHANGE_FEED_THRESHOLDS = {
+    "近一年": 1.0,
+    "近三年": 2.0,
+    "规模": 0.5,
+    "跟踪误差": 0.1,
+}
+
+# --- 可选的 SQLite 工作库 (fund_store.py，run_all.py --store 启用) ---
+STORE_FILE = "fund_store.db"
+
 # --- 整合为统一的配置对象 ---
 CONFIGS = {
     "nasdaq": {
         "index_name": "nasdaq",
         "report_title": "纳斯达克100基金数据每日报告",
         "funds_details": NASDAQ_FUNDS,
+        "share_classes": NASDAQ_SHARE_CLASSES,
         "source_file": "nasdaq_scraped_details.tsv", # 抓取数据的输出文件
         "target_file": "nasdaq_fund_data.tsv",      # 手动维护的核心数据文件
-        "output_report_file": "nasdaq_report.html"  # 最终生成的HTML报告
+        "output_report_file": "nasdaq_report.html", # 最终生成的HTML报告
+        "digest_file": "nasdaq_digest.json",        # 上一次抓取的每基金摘要
+        "change_feed_file": "nasdaq_changes.jsonl"  # 变更流 (JSON Lines)
     },
     "sp500": {
         "index_name": "sp500",
         "report_title": "标普500基金数据每日报告",
         "funds_details": SP500_FUNDS,
+        "share_classes": SP500_SHARE_CLASSES,
         "source_file": "sp500_scraped_details.tsv",
         "target_file": "sp500_fund_data.tsv",
-        "output_report_file": "sp500_report.html"
+        "output_report_file": "sp500_report.html",
+        "digest_file": "sp500_digest.json",
+        "change_feed_file": "sp500_changes.jsonl"
     }
-}
\ No newline at end of file
+}
+
+
+def iter_share_classes(config: dict):
+    """按抓取顺序依次产出 (基金代码, 支付宝名称, 天天基金名称)：每个主份额之后紧跟它的兄弟份额。"""
+    share_classes = config.get("share_classes", {})
+    for fund in config["funds_details"]:
+        yield fund
+        yield from share_classes.get(fund[0], [])
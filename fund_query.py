@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------------
+# Mission:  对所有指数合并后的基金数据做临时筛选/排序/Top-K 查询，无需重新运行整个流程。
+#
+#  数据按列保存在内存中 (数值列为 numpy 数组)，加载时为每个数值列预先计算升序/降序的排序索引，
+#  查询时只需对过滤掩码做向量化运算，再按预排序索引取前 K 条。
+#
+#  如何使用:
+#     python run_all.py query -w "限额>=1000" -w "运作费率<=0.8" -s 一年涨幅
+#     python run_all.py query -w "名称~纳斯达克" -s 规模 --asc -k 5 -f json
+#     python run_all.py query -s 三年涨幅 -f html -o screen.html
+#     python run_all.py query -i nasdaq --store -s 规模 -k 3
+#
+#  Python API:
+#     table = FundTable.load()
+#     rows = table.query(["限额>=1000", "运作费率<=0.8"], sort_by="一年涨幅", limit=10)
+# -------------------------------------------------------------------------
+import argparse
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+from config import CONFIGS
+
+# 列名统一采用报告中的简称；TSV原列名作为别名
+COLUMN_ALIASES = {
+    '一年涨幅(%)': '一年涨幅', '三年涨幅(%)': '三年涨幅', '规模(亿元)': '规模', '限额(元)': '限额',
+    '买入费率(%)': '买入费率', '运作费率(年，%)': '运作费率', '零成本持有天数': '天数',
+}
+NUMERIC_COLUMNS = ['一年涨幅', '三年涨幅', '规模', '限额', '买入费率', '运作费率', '天数']
+TEXT_COLUMNS = ['指数', '名称']
+
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+_CONDITION_RE = re.compile(r"^\s*(.+?)\s*(>=|<=|==|!=|>|<|=|~)\s*(.*?)\s*$")
+
+
+def _to_number(value) -> float:
+    """'31.39%' -> 31.39，'26.94亿元（2025-06-30）' -> 26.94，无法识别 (如 '--') 时为 NaN。"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER_RE.search(str(value))
+    return float(match.group(0)) if match else np.nan
+
+
+class FundTable:
+    """所有指数基金数据的列式内存表。"""
+
+    def __init__(self, columns: dict):
+        self.columns = columns
+        self.size = len(columns['名称'])
+        # 预排序索引: 列名 -> (升序, 降序)，NaN 始终排在最后
+        self.sort_indexes = {}
+        for name in NUMERIC_COLUMNS:
+            values = columns[name]
+            self.sort_indexes[name] = (np.argsort(values, kind='stable'), np.argsort(-values, kind='stable'))
+
+    @classmethod
+    def load(cls, configs: dict = None, store=None) -> "FundTable":
+        """从各指数的 target_file (或 fund_store 工作库) 加载数据。"""
+        configs = configs if configs is not None else CONFIGS
+        frames = []
+        for index_name, config in configs.items():
+            if store is not None:
+                df = store.read_frame(index_name)
+            elif os.path.exists(config["target_file"]):
+                df = pd.read_csv(config["target_file"], sep='\t', encoding='utf-8', dtype=str)
+            else:
+                continue
+            df = df.rename(columns=COLUMN_ALIASES)
+            df.insert(0, '指数', index_name)
+            frames.append(df)
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=TEXT_COLUMNS + NUMERIC_COLUMNS)
+
+        columns = {name: df[name].fillna('').astype(str).to_numpy(dtype=object) for name in TEXT_COLUMNS}
+        for name in NUMERIC_COLUMNS:
+            raw = df[name] if name in df.columns else pd.Series([''] * len(df))
+            columns[name] = np.fromiter((_to_number(v) for v in raw.fillna('')), dtype=float, count=len(df))
+        return cls(columns)
+
+    def _resolve(self, name: str) -> str:
+        name = COLUMN_ALIASES.get(name, name)
+        if name not in self.columns:
+            raise ValueError(f"未知列: {name} (可用列: {', '.join(TEXT_COLUMNS + NUMERIC_COLUMNS)})")
+        return name
+
+    def mask(self, condition: str) -> np.ndarray:
+        """将单个条件 (如 '限额>=1000'、'名称~纳斯达克') 转为布尔掩码。"""
+        match = _CONDITION_RE.match(condition)
+        if not match:
+            raise ValueError(f"无法解析的条件: {condition}")
+        name, op, raw = match.groups()
+        name = self._resolve(name)
+        values = self.columns[name]
+
+        if name in TEXT_COLUMNS:
+            if op == '~':
+                return np.fromiter((raw in v for v in values), dtype=bool, count=self.size)
+            if op in ('=', '=='):
+                return values == raw
+            if op == '!=':
+                return values != raw
+            raise ValueError(f"文本列 {name} 只支持 =、!= 与 ~ (包含)")
+
+        if op == '~':
+            raise ValueError(f"数值列 {name} 不支持 ~")
+        try:
+            target = float(raw)
+        except ValueError:
+            raise ValueError(f"数值列 {name} 的比较值必须是数字: {condition}") from None
+        if op in ('>=', '<='):
+            return values >= target if op == '>=' else values <= target
+        if op in ('>', '<'):
+            return values > target if op == '>' else values < target
+        return values != target if op == '!=' else values == target
+
+    def query(self, conditions: list = None, sort_by: str = None, descending: bool = True,
+              limit: int = None, columns: list = None) -> list:
+        """按条件过滤、排序并取前 limit 条，返回 dict 列表 (数值列为 float，缺失为 None)。"""
+        selected = np.ones(self.size, dtype=bool)
+        for condition in conditions or []:
+            selected &= self.mask(condition)
+
+        if sort_by:
+            sort_by = self._resolve(sort_by)
+            if sort_by not in NUMERIC_COLUMNS:
+                raise ValueError(f"只能按数值列排序: {sort_by} (可用列: {', '.join(NUMERIC_COLUMNS)})")
+            ascending_order, descending_order = self.sort_indexes[sort_by]
+            order = descending_order if descending else ascending_order
+            positions = order[selected[order]]
+        else:
+            positions = np.flatnonzero(selected)
+        if limit is not None:
+            positions = positions[:limit]
+
+        names = [self._resolve(c) for c in columns] if columns else TEXT_COLUMNS + NUMERIC_COLUMNS
+        rows = []
+        for i in positions:
+            row = {}
+            for name in names:
+                value = self.columns[name][i]
+                row[name] = (None if np.isnan(value) else float(value)) if name in NUMERIC_COLUMNS else value
+            rows.append(row)
+        return rows
+
+
+def format_table(rows: list) -> str:
+    """渲染为终端表格 (按显示宽度对齐，中文字符计为2)。"""
+    if not rows:
+        return "(无匹配结果)"
+
+    def width(text: str) -> int:
+        return sum(2 if ord(ch) > 0x2E80 else 1 for ch in text)
+
+    def cell(value) -> str:
+        if value is None:
+            return "--"
+        return f"{value:g}" if isinstance(value, float) else str(value)
+
+    headers = list(rows[0].keys())
+    table = [headers] + [[cell(row[h]) for h in headers] for row in rows]
+    widths = [max(width(line[i]) for line in table) for i in range(len(headers))]
+    lines = ["  ".join(text + " " * (widths[i] - width(text)) for i, text in enumerate(line)) for line in table]
+    lines.insert(1, "  ".join("-" * w for w in widths))
+    return "\n".join(lines)
+
+
+def format_html(rows: list, title: str = "基金筛选结果") -> str:
+    from reporter import render_report_html
+    html_table = pd.DataFrame(rows).to_html(index=False, classes='fund-table', border=0, na_rep='--')
+    return render_report_html(title, html_table)
+
+
+def add_query_arguments(parser):
+    parser.add_argument('-w', '--where', action='append', default=[],
+                        help="过滤条件，可重复，例如 '限额>=1000'、'运作费率<=0.8'、'名称~纳斯达克'。")
+    parser.add_argument('-s', '--sort', type=str, help="排序列，例如 '一年涨幅'。")
+    parser.add_argument('--asc', action='store_true', help="升序排列 (默认降序)。")
+    parser.add_argument('-k', '--limit', type=int, help="只返回前 K 条。")
+    parser.add_argument('-c', '--columns', type=str, help="输出的列，逗号分隔。")
+    parser.add_argument('-f', '--format', choices=['table', 'json', 'html'], default='table')
+    parser.add_argument('-o', '--output', type=str, help="输出到文件 (默认打印到终端)。")
+    # 与 run_all.py 顶层参数同名；默认值为 SUPPRESS，写在 query 之前或之后都有效，且不会互相覆盖
+    parser.add_argument('-i', '--index', type=str, choices=CONFIGS.keys(), default=argparse.SUPPRESS,
+                        help="只查询指定指数。")
+    parser.add_argument('--store', action='store_true', default=argparse.SUPPRESS,
+                        help="从 SQLite 工作库读取，而不是 target_file。")
+
+
+def run_query(args, configs: dict = None, store=None) -> bool:
+    """执行查询并输出结果；条件、排序列或输出列无效时打印错误信息并返回 False。"""
+    table = FundTable.load(configs, store=store)
+    try:
+        rows = table.query(args.where, sort_by=args.sort, descending=not args.asc, limit=args.limit,
+                           columns=args.columns.split(',') if args.columns else None)
+    except ValueError as e:
+        print(f"错误：{e}")
+        return False
+    if args.format == 'json':
+        output = json.dumps(rows, ensure_ascii=False, indent=2)
+    elif args.format == 'html':
+        output = format_html(rows)
+    else:
+        output = format_table(rows)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"已将 {len(rows)} 条结果写入 '{os.path.abspath(args.output)}'。")
+    else:
+        print(output)
+    return True
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------------
+# Mission:  可选的 SQLite (WAL) 工作库，替代 “读整份TSV -> 更新 -> 写整份TSV” 的往返。
+#
+#  表结构:
+#     funds              -> 基金主数据 (来自 config.CONFIGS，以及TSV中未配置的基金，如C类)
+#     manual_attributes  -> 手动维护的字段 (限额、买入费率、运作费率、零成本持有天数)
+#     dynamics           -> 抓取得到的动态数据 (涨幅、规模)
+#
+#     tsv_sync           -> 每个指数的 target_file 最近一次导入/导出时的修改时间
+#
+#  WAL 模式下，报告等读取方可以与合并写入同时进行。
+#  TSV 的导入/导出保留，用于兼容原有文件与手动编辑；target_file 在上次同步后被手动修改时，
+#  ensure_store 会先重新导入，手动编辑不会被下一次导出覆盖:
+#     python fund_store.py import   # target_file -> 数据库
+#     python fund_store.py export   # 数据库 -> target_file
+# -------------------------------------------------------------------------
+import argparse
+import csv
+import os
+import sqlite3
+import time
+from config import CONFIGS, STORE_FILE, iter_share_classes
+
+# TSV列名 -> (表, 字段)，顺序即导出时的列顺序
+TSV_COLUMNS = [
+    ("名称", "funds", "name"),
+    ("一年涨幅(%)", "dynamics", "one_year"),
+    ("三年涨幅(%)", "dynamics", "three_year"),
+    ("规模(亿元)", "dynamics", "scale"),
+    ("限额(元)", "manual_attributes", "purchase_limit"),
+    ("买入费率(%)", "manual_attributes", "buy_fee"),
+    ("运作费率(年，%)", "manual_attributes", "ops_fee"),
+    ("零成本持有天数", "manual_attributes", "hold_days"),
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS funds (
+    name        TEXT PRIMARY KEY,
+    index_name  TEXT NOT NULL,
+    code        TEXT UNIQUE,
+    source_name TEXT,
+    position    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_funds_index ON funds (index_name, position);
+
+CREATE TABLE IF NOT EXISTS manual_attributes (
+    name           TEXT PRIMARY KEY REFERENCES funds (name),
+    purchase_limit TEXT,
+    buy_fee        TEXT,
+    ops_fee        TEXT,
+    hold_days      TEXT
+);
+
+CREATE TABLE IF NOT EXISTS dynamics (
+    name        TEXT PRIMARY KEY REFERENCES funds (name),
+    one_year    TEXT,
+    three_year  TEXT,
+    scale       TEXT,
+    tracking    TEXT,
+    updated_at  TEXT
+);
+
+CREATE TABLE IF NOT EXISTS tsv_sync (
+    index_name  TEXT PRIMARY KEY,
+    mtime_ns    INTEGER NOT NULL
+);
+"""
+
+
+class FundStore:
+    """对 SQLite 工作库的一层薄封装。每个进程/线程各自打开一个实例。"""
+
+    def __init__(self, db_path: str = STORE_FILE):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- 主数据 ---
+    def _next_position(self, index_name: str) -> int:
+        row = self.conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM funds WHERE index_name = ?",
+                                (index_name,)).fetchone()
+        return row[0]
+
+    def _rename(self, old_name: str, new_name: str):
+        """修改基金名称 (主键)，同时更新引用它的两张表；需在事务中调用。"""
+        self.conn.execute("PRAGMA defer_foreign_keys = ON")
+        for table in ("funds", "manual_attributes", "dynamics"):
+            self.conn.execute(f"UPDATE {table} SET name = ? WHERE name = ?", (new_name, old_name))
+
+    def sync_master(self, config: dict):
+        """
+        将配置中的基金写入 funds 表；已存在的基金只更新代码与抓取名称，保留原有顺序。
+        配置中改名的基金 (同一代码对应新的支付宝名称) 沿用原有行并改名，保留手动字段与动态数据。
+        """
+        index_name = config["index_name"]
+        with self.conn:
+            for fund_code, alipay_name, tiantian_name in iter_share_classes(config):
+                row = self.conn.execute("SELECT name FROM funds WHERE code = ?", (fund_code,)).fetchone()
+                if row is not None and row[0] != alipay_name:
+                    if self.conn.execute("SELECT 1 FROM funds WHERE name = ?", (alipay_name,)).fetchone() is None:
+                        self._rename(row[0], alipay_name)
+                    else:
+                        # 新名称已有一行 (如手动加入TSV的行)，代码改归该行
+                        self.conn.execute("UPDATE funds SET code = NULL WHERE code = ?", (fund_code,))
+                self.conn.execute(
+                    """
+                    INSERT INTO funds (name, index_name, code, source_name, position) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET code = excluded.code, source_name = excluded.source_name
+                    """,
+                    (alipay_name, index_name, fund_code, tiantian_name, self._next_position(index_name)))
+
+    def has_index(self, index_name: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM funds WHERE index_name = ? LIMIT 1", (index_name,)).fetchone() is not None
+
+    def _record_tsv_sync(self, config: dict):
+        mtime_ns = os.stat(config["target_file"]).st_mtime_ns
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO tsv_sync (index_name, mtime_ns) VALUES (?, ?)",
+                              (config["index_name"], mtime_ns))
+
+    def tsv_modified(self, config: dict) -> bool:
+        """target_file 在最近一次导入/导出之后是否被修改过 (文件不存在时为 False)。"""
+        try:
+            mtime_ns = os.stat(config["target_file"]).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        row = self.conn.execute("SELECT mtime_ns FROM tsv_sync WHERE index_name = ?", (config["index_name"],)).fetchone()
+        return row is None or row[0] != mtime_ns
+
+    # --- 动态数据 ---
+    def upsert_dynamics(self, records: list) -> int:
+        """
+        按基金代码 upsert 抓取记录 (键与 source_file 表头一致)，跳过失败记录，返回更新条数。
+        空字符串不覆盖已有值，与 TSV 路径中 DataFrame.update 跳过缺失值的行为一致。
+        updated_at 取记录的“抓取时间” (页面获取时间)，缺失时为当前时间。
+        """
+        now = time.strftime("%Y-%m-%dT%H:%M:%S")
+        rows = [
+            (record["近一年"], record["近三年"], record["规模及日期"], record.get("跟踪信息", ""),
+             record.get("抓取时间") or now, record["基金代码"])
+            for record in records
+            if not str(record.get("近一年", "")).startswith(("抓取失败", "网络错误"))
+        ]
+        with self.conn:
+            cursor = self.conn.executemany(
+                """
+                INSERT INTO dynamics (name, one_year, three_year, scale, tracking, updated_at)
+                SELECT name, NULLIF(?, ''), NULLIF(?, ''), NULLIF(?, ''), NULLIF(?, ''), ? FROM funds WHERE code = ?
+                ON CONFLICT (name) DO UPDATE SET
+                    one_year = COALESCE(excluded.one_year, dynamics.one_year),
+                    three_year = COALESCE(excluded.three_year, dynamics.three_year),
+                    scale = COALESCE(excluded.scale, dynamics.scale),
+                    tracking = COALESCE(excluded.tracking, dynamics.tracking),
+                    updated_at = excluded.updated_at
+                """, rows)
+        return cursor.rowcount
+
+    # --- 查询 ---
+    def fetch_rows(self, index_name: str) -> (list, list):
+        """返回 (TSV表头, 行列表)，与 target_file 的内容和顺序一致。"""
+        select = ", ".join(f"{table}.{field}" for _, table, field in TSV_COLUMNS)
+        rows = self.conn.execute(
+            f"""
+            SELECT {select} FROM funds
+            LEFT JOIN dynamics ON dynamics.name = funds.name
+            LEFT JOIN manual_attributes ON manual_attributes.name = funds.name
+            WHERE funds.index_name = ? ORDER BY funds.position
+            """, (index_name,)).fetchall()
+        return [column for column, _, _ in TSV_COLUMNS], rows
+
+    def updated_times(self, index_name: str) -> dict:
+        """返回 {名称: 动态数据更新时间}；从未写入过抓取数据的基金为 None。"""
+        rows = self.conn.execute(
+            """
+            SELECT funds.name, dynamics.updated_at FROM funds
+            LEFT JOIN dynamics ON dynamics.name = funds.name
+            WHERE funds.index_name = ?
+            """, (index_name,)).fetchall()
+        return dict(rows)
+
+    def read_frame(self, index_name: str):
+        """以 DataFrame 形式返回，列与 pd.read_csv(target_file) 的结果相同。"""
+        import pandas as pd
+        headers, rows = self.fetch_rows(index_name)
+        return pd.DataFrame(rows, columns=headers)
+
+    # --- TSV 兼容 ---
+    def import_tsv(self, config: dict) -> int:
+        """
+        将 target_file 导入数据库 (覆盖同名基金的字段)，返回导入行数。
+        TSV中没有的跟踪信息沿用库中原值；动态数据未被改动的基金保留原有的更新时间。
+        """
+        index_name = config["index_name"]
+        codes = {alipay: (code, tiantian) for code, alipay, tiantian in iter_share_classes(config)}
+        with open(config["target_file"], "r", encoding="utf-8-sig", newline="") as f:
+            records = list(csv.DictReader(f, delimiter="\t"))
+        previous = {
+            name: (values, tracking, updated_at)
+            for name, *values, tracking, updated_at in self.conn.execute(
+                """
+                SELECT dynamics.name, one_year, three_year, scale, tracking, updated_at FROM dynamics
+                JOIN funds ON funds.name = dynamics.name WHERE funds.index_name = ?
+                """, (index_name,))
+        }
+        with self.conn:
+            self.conn.execute("DELETE FROM manual_attributes WHERE name IN (SELECT name FROM funds WHERE index_name = ?)", (index_name,))
+            self.conn.execute("DELETE FROM dynamics WHERE name IN (SELECT name FROM funds WHERE index_name = ?)", (index_name,))
+            self.conn.execute("DELETE FROM funds WHERE index_name = ?", (index_name,))
+            for position, record in enumerate(records):
+                name = record["名称"]
+                code, tiantian_name = codes.get(name, (None, None))
+                self.conn.execute("INSERT INTO funds (name, index_name, code, source_name, position) VALUES (?, ?, ?, ?, ?)",
+                                  (name, index_name, code, tiantian_name, position))
+                for table in ("dynamics", "manual_attributes"):
+                    fields = [(field, record.get(column, "")) for column, t, field in TSV_COLUMNS if t == table]
+                    if table == "dynamics" and name in previous:
+                        values, tracking, updated_at = previous[name]
+                        unchanged = [value or "" for value in values] == [value for _, value in fields]
+                        fields += [("tracking", tracking), ("updated_at", updated_at if unchanged else None)]
+                    self.conn.execute(
+                        f"INSERT INTO {table} (name, {', '.join(f for f, _ in fields)}) VALUES (?{', ?' * len(fields)})",
+                        [name] + [value for _, value in fields])
+        self.sync_master(config)
+        self._record_tsv_sync(config)
+        return len(records)
+
+    def export_tsv(self, config: dict, output_file: str = None) -> int:
+        """将数据库内容导出为 target_file 格式，返回导出行数。"""
+        headers, rows = self.fetch_rows(config["index_name"])
+        with open(output_file or config["target_file"], "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, delimiter="\t", lineterminator="\n")
+            writer.writerow(headers)
+            writer.writerows(["" if value is None else value for value in row] for row in rows)
+        if output_file is None:
+            self._record_tsv_sync(config)
+        return len(rows)
+
+
+def ensure_store(config: dict, db_path: str = STORE_FILE):
+    """
+    打开工作库；该指数尚无数据，或 target_file 在上次同步后被手动修改时，从 target_file (重新) 导入。
+    首次使用而 target_file 不存在时打印错误并返回 None，调用方按 TSV 路径处理 (与 combiner 一致)。
+    """
+    target_file = config["target_file"]
+    store = FundStore(db_path)
+    if not store.has_index(config["index_name"]):
+        if not os.path.exists(target_file):
+            print(f"错误：文件未找到 - {target_file}")
+            print("请确认对应的基础数据文件是否存在。")
+            store.close()
+            return None
+        count = store.import_tsv(config)
+        print(f"已从 '{target_file}' 导入 {count} 条记录到工作库 '{db_path}'。")
+    elif store.tsv_modified(config):
+        count = store.import_tsv(config)
+        print(f"'{target_file}' 在上次同步后被修改，已重新导入 {count} 条记录到工作库 '{db_path}'。")
+    else:
+        store.sync_master(config)
+    return store
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="SQLite 工作库与 TSV 之间的导入/导出。")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument('-i', '--index', type=str, choices=CONFIGS.keys(), required=False)
+    parser.add_argument('--db', type=str, default=STORE_FILE)
+    args = parser.parse_args()
+
+    target_configs = {args.index: CONFIGS[args.index]} if args.index else CONFIGS
+    with FundStore(args.db) as store:
+        for config_name, config_data in target_configs.items():
+            if args.command == "import":
+                try:
+                    count = store.import_tsv(config_data)
+                except FileNotFoundError as e:
+                    print(f"{config_name}: 错误：文件未找到 - {e}")
+                    continue
+                print(f"{config_name}: 已从 '{config_data['target_file']}' 导入 {count} 条记录。")
+            else:
+                count = store.export_tsv(config_data)
+                print(f"{config_name}: 已导出 {count} 条记录到 '{config_data['target_file']}'。")
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------------
+# Mission:  增量维护每只基金的历史净值 (NAV) 序列，并在本地计算任意窗口的收益率，
+#           不再依赖页面上预先计算、可能过期或被四舍五入的“近1年/近3年”字符串。
+#
+#  存储: nav_history/<基金代码>.tsv，列为 日期 / 单位净值 / 累计净值，按日期升序追加。
+#  增量: 每次只请求本地最后一个日期之后的数据；首次运行回填 BACKFILL_DAYS 天。
+# -------------------------------------------------------------------------
+import csv
+import datetime
+import os
+import time
+import numpy as np
+import pandas as pd
+import requests
+from config import CONFIGS, iter_share_classes
+
+NAV_HISTORY_DIR = "nav_history"
+# 可指向本地的测试用服务，接口格式与天天基金 f10/lsjz 一致
+NAV_API_URL = "http://api.fund.eastmoney.com/f10/lsjz"
+NAV_PAGE_SIZE = 20
+# 每次请求净值接口后的等待时间；首次回填一只基金约需数十页，逐页限速以免集中请求
+NAV_REQUEST_INTERVAL_SECONDS = 0.5
+BACKFILL_DAYS = 3 * 365 + 30
+HISTORY_COLUMNS = ["日期", "单位净值", "累计净值"]
+
+# 常用收益窗口 (天)
+RETURN_WINDOWS = {"近一年": 365, "近三年": 3 * 365}
+
+
+def _history_path(fund_code: str) -> str:
+    return os.path.join(NAV_HISTORY_DIR, f"{fund_code}.tsv")
+
+
+def last_stored_date(fund_code: str):
+    """只读取文件末尾，返回本地已保存的最后一个日期 (datetime.date)，无记录时返回 None。"""
+    path = _history_path(fund_code)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 256))
+        lines = f.read().decode("utf-8", errors="ignore").strip().splitlines()
+    if not lines or lines[-1].startswith(HISTORY_COLUMNS[0]):
+        return None
+    return datetime.date.fromisoformat(lines[-1].split("\t", 1)[0])
+
+
+def fetch_nav_since(fund_code: str, start_date: datetime.date, end_date: datetime.date = None) -> list:
+    """
+    从净值接口分页获取 [start_date, end_date] 区间的净值，返回按日期升序的 (日期, 单位净值, 累计净值) 列表。
+    """
+    end_date = end_date or datetime.date.today()
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Referer': f"http://fundf10.eastmoney.com/jjjz_{fund_code}.html",
+    }
+    rows = []
+    page_index = 1
+    while True:
+        params = {
+            "fundCode": fund_code,
+            "pageIndex": page_index,
+            "pageSize": NAV_PAGE_SIZE,
+            "startDate": start_date.isoformat(),
+            "endDate": end_date.isoformat(),
+        }
+        response = requests.get(NAV_API_URL, params=params, headers=headers, timeout=10)
+        time.sleep(NAV_REQUEST_INTERVAL_SECONDS)
+        response.raise_for_status()
+        payload = response.json()
+        page = (payload.get("Data") or {}).get("LSJZList") or []
+        for item in page:
+            if not item.get("DWJZ"):
+                continue
+            rows.append((item["FSRQ"], item["DWJZ"], item.get("LJJZ") or item["DWJZ"]))
+        if len(page) < NAV_PAGE_SIZE or page_index * NAV_PAGE_SIZE >= payload.get("TotalCount", 0):
+            break
+        page_index += 1
+    rows.sort(key=lambda row: row[0])
+    return rows
+
+
+def update_nav_history(fund_code: str) -> (int, str):
+    """
+    增量更新单只基金的净值历史，返回 (新增条数, 错误信息或 None)。
+    """
+    os.makedirs(NAV_HISTORY_DIR, exist_ok=True)
+    last_date = last_stored_date(fund_code)
+    today = datetime.date.today()
+    if last_date is None:
+        start_date = today - datetime.timedelta(days=BACKFILL_DAYS)
+    elif last_date >= today:
+        return 0, None
+    else:
+        start_date = last_date + datetime.timedelta(days=1)
+
+    try:
+        rows = fetch_nav_since(fund_code, start_date, today)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        return 0, f"净值接口请求错误: {e}"
+
+    if last_date is not None:
+        rows = [row for row in rows if row[0] > last_date.isoformat()]
+    if not rows:
+        return 0, None
+
+    path = _history_path(fund_code)
+    write_header = not os.path.exists(path)
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter="\t")
+        if write_header:
+            writer.writerow(HISTORY_COLUMNS)
+        writer.writerows(rows)
+    return len(rows), None
+
+
+def load_nav_history(fund_code: str) -> pd.DataFrame:
+    path = _history_path(fund_code)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    return pd.read_csv(path, sep="\t", encoding="utf-8", parse_dates=["日期"])
+
+
+def compute_returns(history: pd.DataFrame, windows: dict = None, as_of=None) -> dict:
+    """
+    基于累计净值计算各窗口收益率 (百分比)，windows 为 {名称: 天数}。
+    对每个窗口取起点日期当天或之前最近的一个净值；历史不足时返回 None。
+    """
+    windows = windows or RETURN_WINDOWS
+    if history.empty:
+        return {name: None for name in windows}
+
+    dates = history["日期"].to_numpy(dtype="datetime64[D]")
+    navs = history["累计净值"].to_numpy(dtype=float)
+    end = len(dates) - 1 if as_of is None else np.searchsorted(dates, np.datetime64(as_of, "D"), side="right") - 1
+    if end < 0:
+        return {name: None for name in windows}
+
+    names = list(windows)
+    starts = dates[end] - np.array([windows[name] for name in names], dtype="timedelta64[D]")
+    positions = np.searchsorted(dates, starts, side="right") - 1
+    valid = positions >= 0
+    returns = np.where(valid, navs[end] / navs[np.clip(positions, 0, None)] - 1.0, np.nan) * 100.0
+    return {name: (None if np.isnan(value) else round(float(value), 2)) for name, value in zip(names, returns)}
+
+
+def format_return(value) -> str:
+    """与页面格式保持一致：'31.39%'，无数据时为 '--'。"""
+    return "--" if value is None else f"{value:.2f}%"
+
+
+def nav_returns_for_fund(fund_code: str, windows: dict = None) -> (dict, str):
+    """增量更新后计算收益率，返回 ({窗口名称: 收益率}, 错误信息或 None)。"""
+    _, error = update_nav_history(fund_code)
+    return compute_returns(load_nav_history(fund_code), windows), error
+
+
+def update_history_for_config(config: dict):
+    index_name = config["index_name"]
+    print(f"--- 开始为 '{index_name}' 指数增量更新净值历史 ---")
+    for fund_code, alipay_name, tiantian_name in iter_share_classes(config):
+        added, error = update_nav_history(fund_code)
+        if error:
+            print(f"  - [错误] {tiantian_name} ({fund_code}): {error}")
+        else:
+            print(f"  - [成功] {tiantian_name} ({fund_code}): 新增 {added} 条净值记录。")
+
+
+if __name__ == '__main__':
+    print("===== 执行全量净值历史增量更新任务 =====")
+    for config_name, config_data in CONFIGS.items():
+        update_history_for_config(config_data)
+        print("-" * 50)
+    print("===== 所有净值历史更新任务已完成 =====")
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------------
+# Mission:  可选的轻量级报告服务 (仅依赖标准库 asyncio)。
+#           将最新的HTML报告与JSON数据预先gzip后常驻内存，支持 ETag / 304，
+#           请求处理过程中不读磁盘；后台定期检查输出文件的修改时间并重新加载。
+#
+#  如何使用:
+#     python report_server.py                  # 监听 127.0.0.1:8000
+#     python report_server.py --host 0.0.0.0 --port 8080
+#
+#  路由:
+#     /                       -> 指数列表
+#     /<index>                -> 该指数的HTML报告 (output_report_file)
+#     /<index>.json           -> 该指数的核心数据 (target_file 转为JSON)
+#     /<index>/changes.jsonl  -> 该指数的变更流 (change_feed_file)
+# -------------------------------------------------------------------------
+import argparse
+import asyncio
+import csv
+import gzip
+import hashlib
+import json
+import os
+from config import CONFIGS
+
+RELOAD_INTERVAL_SECONDS = 2.0
+
+
+class Asset:
+    """一个已渲染好的响应体，同时保存原文与gzip版本；两种编码各有独立的强ETag。"""
+    __slots__ = ("body", "gzipped", "etag", "gzip_etag", "content_type")
+
+    def __init__(self, body: bytes, content_type: str):
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        tag = hashlib.sha1(body).hexdigest()[:20]
+        self.etag = f'"{tag}"'
+        self.gzip_etag = f'"{tag}-gz"'
+        self.content_type = content_type
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """按 RFC 9110 解析 If-None-Match (逗号分隔列表，弱比较，支持 *)。"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """按 RFC 9110 解析 Accept-Encoding 的 q 值；gzip (或 *) 的 q 大于 0 时才返回 True。"""
+    explicit, wildcard = None, None
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        coding = coding.lower()
+        if coding in ("gzip", "x-gzip"):
+            explicit = q if explicit is None else max(explicit, q)
+        elif coding == "*":
+            wildcard = q
+    q = explicit if explicit is not None else wildcard
+    return q is not None and q > 0
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _tsv_to_json(path: str) -> bytes:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.DictReader(f, delimiter="\t"))
+    return json.dumps(rows, ensure_ascii=False).encode("utf-8")
+
+
+class ReportStore:
+    """
+    内存中的报告仓库。每个路由对应一个源文件和渲染函数；
+    只有源文件的修改时间变化时才重新读取，请求侧只做字典查找。
+    """
+
+    def __init__(self, configs: dict):
+        self.sources = {}
+        for index_name, config in configs.items():
+            self.sources[f"/{index_name}"] = (config["output_report_file"], _read_bytes, "text/html; charset=utf-8")
+            self.sources[f"/{index_name}.json"] = (config["target_file"], _tsv_to_json, "application/json; charset=utf-8")
+            self.sources[f"/{index_name}/changes.jsonl"] = (config["change_feed_file"], _read_bytes, "application/x-ndjson; charset=utf-8")
+        self.assets = {}
+        self._mtimes = {}
+        self._index_names = list(configs.keys())
+
+    def reload(self) -> list:
+        """
+        检查所有源文件，重新加载有变化的条目，返回被更新的路由列表。
+        读取与gzip压缩较慢，服务运行时通过 asyncio.to_thread 在线程中调用；
+        对 assets 的修改都是单个键的替换，请求侧的字典查找总能拿到完整的旧值或新值。
+        """
+        updated = []
+        for route, (path, render, content_type) in self.sources.items():
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                if self.assets.pop(route, None) is not None:
+                    updated.append(route)
+                self._mtimes.pop(route, None)
+                continue
+            if self._mtimes.get(route) == mtime:
+                continue
+            try:
+                self.assets[route] = Asset(render(path), content_type)
+                self._mtimes[route] = mtime
+                updated.append(route)
+            except Exception as e:
+                print(f"  - [错误] 加载 '{path}' 失败: {e}")
+        if updated:
+            self.assets["/"] = Asset(self._render_index(), "text/html; charset=utf-8")
+        return updated
+
+    def _render_index(self) -> bytes:
+        items = "".join(
+            f'<li><a href="/{name}">{name}</a> · <a href="/{name}.json">json</a> · '
+            f'<a href="/{name}/changes.jsonl">changes</a></li>'
+            for name in self._index_names
+        )
+        return f'<!DOCTYPE html><html lang="zh-CN"><head><meta charset="UTF-8"><title>基金报告</title></head><body><ul>{items}</ul></body></html>'.encode("utf-8")
+
+
+def _response(status: str, headers: list, body: bytes = b"") -> bytes:
+    head = [f"HTTP/1.1 {status}"] + headers + [f"Content-Length: {len(body)}", "", ""]
+    return "\r\n".join(head).encode("latin-1") + body
+
+
+async def _handle(store: ReportStore, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            request_head = await reader.readuntil(b"\r\n\r\n")
+            lines = request_head.decode("latin-1").split("\r\n")
+            method, target, version = (lines[0].split(" ") + ["", "", ""])[:3]
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    key, value = line.split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+            # 请求体必须读掉，否则会被当作下一个请求的开头；无法确定长度时直接关闭连接
+            if "transfer-encoding" in headers:
+                keep_alive = False
+            else:
+                try:
+                    content_length = int(headers.get("content-length", "0"))
+                except ValueError:
+                    content_length, keep_alive = 0, False
+                if content_length > 0:
+                    await reader.readexactly(content_length)
+            if method not in ("GET", "HEAD"):
+                keep_alive = False
+            connection = "Connection: keep-alive" if keep_alive else "Connection: close"
+
+            asset = store.assets.get(target.split("?", 1)[0].rstrip("/") or "/")
+            use_gzip = _accepts_gzip(headers.get("accept-encoding", ""))
+            etag = (asset.gzip_etag if use_gzip else asset.etag) if asset is not None else None
+            if method not in ("GET", "HEAD"):
+                writer.write(_response("405 Method Not Allowed", ["Allow: GET, HEAD", connection]))
+            elif asset is None:
+                writer.write(_response("404 Not Found", ["Content-Type: text/plain; charset=utf-8", connection], b"not found"))
+            elif _etag_matches(headers.get("if-none-match", ""), etag):
+                writer.write(_response("304 Not Modified", [f"ETag: {etag}", "Vary: Accept-Encoding", connection]))
+            else:
+                body = asset.gzipped if use_gzip else asset.body
+                response_headers = [f"Content-Type: {asset.content_type}", f"ETag: {etag}",
+                                    "Cache-Control: no-cache", "Vary: Accept-Encoding", connection]
+                if use_gzip:
+                    response_headers.append("Content-Encoding: gzip")
+                response = _response("200 OK", response_headers, body)
+                if method == "HEAD":
+                    response = response[:len(response) - len(body)]
+                writer.write(response)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _reload_loop(store: ReportStore, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        updated = await asyncio.to_thread(store.reload)
+        if updated:
+            print(f"[重新加载] {', '.join(updated)}")
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8000, configs: dict = None,
+                reload_interval: float = RELOAD_INTERVAL_SECONDS):
+    """启动报告服务，直到被取消。"""
+    store = ReportStore(configs if configs is not None else CONFIGS)
+    await asyncio.to_thread(store.reload)
+    server = await asyncio.start_server(lambda r, w: _handle(store, r, w), host, port)
+    print(f"报告服务已启动: http://{host}:{port}/")
+    reload_task = asyncio.create_task(_reload_loop(store, reload_interval))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        reload_task.cancel()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="基金报告内存服务。")
+    parser.add_argument('--host', type=str, default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL_SECONDS,
+                        help="检查输出文件是否更新的间隔 (秒)。")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, reload_interval=args.reload_interval))
+    except KeyboardInterrupt:
+        print("\n报告服务已停止。")
@@ -2,9 +2,46 @@ import pandas as pd
 import os
 from config import CONFIGS
 
-def report_for_config(config: dict):
+CSS_STYLES = """
+body { font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif; font-size: 14px; background-color: #f4f7f6; color: #333; margin: 0; padding: 20px; }
+h1 { color: #2c5e2e; text-align: center; margin-bottom: 25px; }
+.table-container { overflow-x: auto; }
+.fund-table { width: 95%; margin: 0 auto; border-collapse: collapse; box-shadow: 0 4px 10px rgba(0, 0, 0, 0.1); background-color: #ffffff; }
+.fund-table th, .fund-table td { padding: 12px 15px; border: 1px solid #ddd; text-align: left; }
+.fund-table th { background-color: #347a38; color: #ffffff; font-weight: bold; text-align: center; }
+.fund-table tr:nth-child(even) { background-color: #f9f9f9; }
+.fund-table tr:hover { background-color: #e8f5e9; cursor: pointer; }
+"""
+
+def render_report_html(report_title: str, html_table: str) -> str:
+    """将表格片段包装为完整的HTML页面 (报告与临时查询结果共用)。"""
+    return f"""
+<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{report_title}</title>
+    <style>{CSS_STYLES}</style>
+</head>
+<body>
+    <h1>{report_title}</h1>
+    <div class="table-container">{html_table}</div>
+</body>
+</html>
+"""
+
+def _format_percent(value) -> str:
+    """'0.6' -> '0.6%'；缺失的手动字段 (如新加入的C类份额) 显示为 '--'。"""
+    if pd.isna(value) or str(value).strip() == '':
+        return '--'
+    return f"{value}%"
+
+def report_for_config(config: dict, store=None, row_ages: dict = None):
     """
     根据传入的配置对象，生成HTML报告。
+    传入 store (fund_store.FundStore) 时从工作库读取数据，而不是 target_file。
+    传入 row_ages ({名称: 数据年龄(秒)}) 时，在名称后增加“数据时间”列，标出过期的行。
     """
     input_file = config["target_file"]
     output_file = config["output_report_file"]
@@ -13,36 +50,33 @@ def report_for_config(config: dict):
 
     print(f"--- 开始为 '{index_name}' 指数生成HTML报告 ---")
 
-    CSS_STYLES = """
-    body { font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif; font-size: 14px; background-color: #f4f7f6; color: #333; margin: 0; padding: 20px; }
-    h1 { color: #2c5e2e; text-align: center; margin-bottom: 25px; }
-    .table-container { overflow-x: auto; }
-    .fund-table { width: 95%; margin: 0 auto; border-collapse: collapse; box-shadow: 0 4px 10px rgba(0, 0, 0, 0.1); background-color: #ffffff; }
-    .fund-table th, .fund-table td { padding: 12px 15px; border: 1px solid #ddd; text-align: left; }
-    .fund-table th { background-color: #347a38; color: #ffffff; font-weight: bold; text-align: center; }
-    .fund-table tr:nth-child(even) { background-color: #f9f9f9; }
-    .fund-table tr:hover { background-color: #e8f5e9; cursor: pointer; }
-    """
-
     try:
-        if not os.path.exists(input_file):
-            raise FileNotFoundError(f"错误：输入文件未找到 -> {input_file}")
+        if store is not None:
+            df = store.read_frame(index_name)
+            print(f"步骤 1/6: 成功从工作库 '{store.db_path}' 读取 {len(df)} 条记录。")
+        else:
+            if not os.path.exists(input_file):
+                raise FileNotFoundError(f"错误：输入文件未找到 -> {input_file}")
 
-        df = pd.read_csv(input_file, sep='\t', encoding='utf-8')
-        print(f"步骤 1/6: 成功从 '{input_file}' 读取 {len(df)} 条记录。")
+            df = pd.read_csv(input_file, sep='\t', encoding='utf-8')
+            print(f"步骤 1/6: 成功从 '{input_file}' 读取 {len(df)} 条记录。")
 
         if '规模(亿元)' in df.columns:
-            df['规模(亿元)'] = df['规模(亿元)'].astype(str).str.split('（').str[0]
+            df['规模(亿元)'] = df['规模(亿元)'].astype('string').str.split('（').str[0]
             print("步骤 2/6: 已清理'规模(亿元)'列。")
 
         if '买入费率(%)' in df.columns:
-            df['买入费率(%)'] = df['买入费率(%)'].astype(str) + '%'
+            df['买入费率(%)'] = df['买入费率(%)'].map(_format_percent)
             print("步骤 3/6: 已格式化'买入费率'列。")
         
         if '运作费率(年，%)' in df.columns:
-            df['运作费率(年，%)'] = df['运作费率(年，%)'].astype(str) + '%'
+            df['运作费率(年，%)'] = df['运作费率(年，%)'].map(_format_percent)
             print("步骤 4/6: 已格式化'运作费率'列。")
 
+        if row_ages is not None:
+            from staleness import format_age
+            df.insert(1, '数据时间', [format_age(row_ages.get(name)) for name in df['名称']])
+
         rename_mapping = {
             '一年涨幅(%)': '一年涨幅', '三年涨幅(%)': '三年涨幅', '规模(亿元)': '规模',
             '买入费率(%)': '买入费率', '运作费率(年，%)': '运作费率', '零成本持有天数': '天数'
@@ -50,24 +84,10 @@ def report_for_config(config: dict):
         df.rename(columns=rename_mapping, inplace=True)
         print("步骤 5/6: 已更新表格标题。")
 
-        html_table = df.to_html(index=False, classes='fund-table', border=0)
+        html_table = df.to_html(index=False, classes='fund-table', border=0, na_rep='--')
         print("步骤 6/6: 已将数据转换为HTML表格。")
 
-        full_html_content = f"""
-<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{report_title}</title>
-    <style>{CSS_STYLES}</style>
-</head>
-<body>
-    <h1>{report_title}</h1>
-    <div class="table-container">{html_table}</div>
-</body>
-</html>
-"""
+        full_html_content = render_report_html(report_title, html_table)
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(full_html_content)
         
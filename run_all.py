@@ -8,23 +8,80 @@
 #     - 处理所有指数: `python run_all.py`
 #     - 只处理纳斯达克: `python run_all.py --index nasdaq`
 #     - 只处理标普500:  `python run_all.py -i sp500`
+#     - 用本地净值历史计算收益率: `python run_all.py --nav-history`
+#     - 从缓存快照预热/离线复现: `python run_all.py --snapshot snapshot.zip`
+#     - 使用 SQLite 工作库代替 TSV 往返: `python run_all.py --store`
+#     - 流式抓取，读到所需区块即断开: `python run_all.py --streaming`
+#     - 先用上次的数据立即发布报告，再刷新: `python run_all.py --swr`
+#     - 临时筛选已合并的数据 (不运行流程): `python run_all.py query -w "限额>=1000" -s 一年涨幅`
+#       (-i/--index 与 --store 写在 query 之前或之后均可，如 `python run_all.py query -i nasdaq --store`)
+#       (详见 fund_query.py)
+#  3. (可选) 另开一个进程运行 `python report_server.py`，
+#     它会在内存中托管最新报告，并在本流程重新生成输出后自动加载。
 #
 #  它会按照以下顺序，为指定的指数基金组 (或所有组)，
 #  自动、依次地执行完整的处理流程：
 #
 #  流程:
 #  (1) scraper.py   -> 抓取最新的净值、规模等动态数据。
-#  (2) combiner.py  -> 将抓取到的新数据合并到基础数据文件中。
-#  (3) reporter.py  -> 基于更新后的数据，生成最终的HTML报告。
+#  (2) change_feed.py -> 与上次抓取的摘要比对，输出变化超过阈值的基金。
+#  (3) combiner.py  -> 将抓取到的新数据合并到基础数据文件中。
+#  (4) reporter.py  -> 基于更新后的数据，生成最终的HTML报告。
 #
 # =========================================================================
 
+import sys
 import time
 import argparse
 from config import CONFIGS
-from scraper import scrape_for_config
+import scraper
+from scraper import scrape_for_config, attach_snapshot
+from change_feed import change_feed_for_config
 from combiner import combine_for_config
 from reporter import report_for_config
+from fund_store import ensure_store, FundStore
+from fund_query import add_query_arguments, run_query
+from staleness import fund_ages, stale_names, data_fingerprint
+
+def refresh_config(config_data: dict, args, store=None):
+    """抓取、变更检测与合并 (不含报告生成)。"""
+    # --- 流程1：执行数据抓取 ---
+    records = scrape_for_config(config_data, use_nav_history=args.nav_history)
+
+    # --- 流程1.5：检测与上次抓取相比的变化 ---
+    change_feed_for_config(config_data, records)
+
+    # --- 流程2：执行数据合并 ---
+    # stale-while-revalidate 模式下，抓取失败的行保留已发布的值，不用错误信息覆盖
+    combine_for_config(config_data, store=store, records=records, skip_failed=args.swr)
+
+def run_stale_while_revalidate(target_configs: dict, args):
+    """
+    先基于上次的数据立即发布所有报告 (标出每行的数据时间)，
+    再逐个指数刷新数据，只有数据发生变化时才重新发布该指数的报告。
+    """
+    published = {}
+    print("\n---------- 阶段1: 基于已有数据立即发布报告 ----------")
+    for config_name, config_data in target_configs.items():
+        store = ensure_store(config_data) if args.store else None
+        report_for_config(config_data, store=store, row_ages=fund_ages(config_data, store=store))
+        published[config_name] = (data_fingerprint(config_data, store), stale_names(config_data, store))
+        if store is not None:
+            store.close()
+
+    print("\n---------- 阶段2: 刷新数据 ----------")
+    for config_name, config_data in target_configs.items():
+        print(f"\n\n========== 刷新指数: {config_name.upper()} ==========")
+        store = ensure_store(config_data) if args.store else None
+        refresh_config(config_data, args, store=store)
+        # 数值变化，或原先过期的行已刷新，才需要重新发布
+        if (data_fingerprint(config_data, store), stale_names(config_data, store)) != published[config_name]:
+            print("数据已更新，重新发布报告。")
+            report_for_config(config_data, store=store, row_ages=fund_ages(config_data, store=store))
+        else:
+            print("数据与过期状态均未变化，保留已发布的报告。")
+        if store is not None:
+            store.close()
 
 def main():
     """
@@ -39,13 +96,55 @@ def main():
         choices=CONFIGS.keys(), # 确保传入的参数是有效的key
         required=False
     )
+    parser.add_argument(
+        '--nav-history',
+        action='store_true',
+        help="增量更新本地净值历史，并据此计算近一年/近三年收益率 (替代页面上的字符串)。"
+    )
+    parser.add_argument(
+        '--snapshot',
+        type=str,
+        help="挂载由 cache_snapshot.py 导出的快照，本地缓存缺失或过期时从快照读取页面。",
+        required=False
+    )
+    parser.add_argument(
+        '--store',
+        action='store_true',
+        help="使用 SQLite 工作库 (config.STORE_FILE) 合并与读取数据；首次使用时自动从 target_file 导入。"
+    )
+    parser.add_argument(
+        '--swr',
+        action='store_true',
+        help="stale-while-revalidate: 先用上次的数据立即发布报告，刷新完成后仅在数据变化时重新发布。"
+    )
+    parser.add_argument(
+        '--streaming',
+        action='store_true',
+        help="流式抓取页面，读到解析所需的区块后立即断开连接 (缓存的页面会被截断并带有标记)。"
+    )
+    subparsers = parser.add_subparsers(dest='command')
+    query_parser = subparsers.add_parser('query', help="对已合并的数据做筛选/排序/Top-K 查询，不运行抓取流程。")
+    add_query_arguments(query_parser)
     args = parser.parse_args()
 
+    if args.command == 'query':
+        store = FundStore() if args.store else None
+        succeeded = run_query(args, configs={args.index: CONFIGS[args.index]} if args.index else CONFIGS, store=store)
+        if store is not None:
+            store.close()
+        if not succeeded:
+            sys.exit(1)
+        return
+
     start_time = time.time()
     print("##################################################")
     print("#######      开始执行基金数据处理流程      #######")
     print("##################################################")
 
+    scraper.STREAMING_FETCH = args.streaming
+    if args.snapshot:
+        attach_snapshot(args.snapshot)
+
     # --- 步骤 2: 决定要处理的目标 ---
     target_configs = {}
     if args.index:
@@ -58,19 +157,24 @@ def main():
         target_configs = CONFIGS
 
     # --- 步骤 3: 遍历并执行任务 ---
-    for config_name, config_data in target_configs.items():
-        print(f"\n\n========== 处理指数: {config_name.upper()} ==========")
-        
-        # --- 流程1：执行数据抓取 ---
-        scrape_for_config(config_data)
+    if args.swr:
+        run_stale_while_revalidate(target_configs, args)
+    else:
+        for config_name, config_data in target_configs.items():
+            print(f"\n\n========== 处理指数: {config_name.upper()} ==========")
         
-        # --- 流程2：执行数据合并 ---
-        combine_for_config(config_data)
+            store = ensure_store(config_data) if args.store else None
+
+            # --- 流程1-2：抓取、变更检测与合并 ---
+            refresh_config(config_data, args, store=store)
         
-        # --- 流程3：执行报告生成 ---
-        report_for_config(config_data)
+            # --- 流程3：执行报告生成 ---
+            report_for_config(config_data, store=store)
+
+            if store is not None:
+                store.close()
         
-        print(f"========== 指数: {config_name.upper()} 处理完成 ==========")
+            print(f"========== 指数: {config_name.upper()} 处理完成 ==========")
 
     end_time = time.time()
     total_time = end_time - start_time
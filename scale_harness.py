@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------------
+# Mission:  端到端规模测试。为 N 只合成基金生成配置、离线页面缓存与基础数据文件，
+#           以合成的 CONFIGS 调用 run_all.main()，完整运行 抓取 -> 变更检测 -> 合并 -> 报告 流程，
+#           记录每个阶段的耗时、相对阶段开始时的RSS峰值增量，以及 tracemalloc 统计的阶段内
+#           峰值与净增最多的分配位置。
+#
+#  每个 N 在独立的子进程和临时目录中运行，互不影响；不访问网络。
+#  阶段峰值RSS依赖 Linux 的 /proc/self/clear_refs 在每个阶段开始时重置峰值，
+#  不支持时退回 ru_maxrss 的增量 (只反映整个进程峰值的抬升，结果中 rss_scope 为 "process")。
+#
+#  如何使用:
+#     python scale_harness.py                              # N = 10,100,1000,10000,100000
+#     python scale_harness.py -n 10,1000 --page-kb 60      # 自定义规模与页面大小
+#     python scale_harness.py --no-trace -o scale.json     # 关闭 tracemalloc，结果另存为JSON
+# -------------------------------------------------------------------------
+import argparse
+import contextlib
+import csv
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DEFAULT_SIZES = "10,100,1000,10000,100000"
+DEFAULT_PAGE_KB = 8
+TOP_ALLOCATORS = 5
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{name}({code})</title></head><body>
+<div class="fundDetail-tit"><div style="float: left">{name}<span>(</span><span class="ui-num">{code}</span><span>)</span></div></div>
+<dl class="dataItem01"><dt>近1月：0.52%</dt><dd><span>近1年：</span><span class="ui-num">{one_year}%</span></dd></dl>
+<dl class="dataItem02"><dd><span>近3年：</span><span class="ui-num">{three_year}%</span></dd></dl>
+<div class="infoOfFund"><table><tr><td>类型：QDII</td><td>规模：{scale}亿元（2025-06-30）</td></tr>
+<tr><td class="specialData">跟踪标的：纳斯达克100指数 |年化跟踪误差：{tracking}%</td></tr></table></div>
+{padding}
+</body></html>
+"""
+
+
+def build_synthetic_config(n: int) -> dict:
+    funds = [(f"{i:06d}", f"合成基金{i}(QDII)A", f"合成基金发起式{i}(QDII)A") for i in range(n)]
+    return {
+        "index_name": f"synthetic{n}",
+        "report_title": f"合成基金规模测试 (N={n})",
+        "funds_details": funds,
+        "share_classes": {},
+        "source_file": "synthetic_scraped_details.tsv",
+        "target_file": "synthetic_fund_data.tsv",
+        "output_report_file": "synthetic_report.html",
+        "digest_file": "synthetic_digest.json",
+        "change_feed_file": "synthetic_changes.jsonl",
+    }
+
+
+def generate_workspace(config: dict, cache_dir: str, page_kb: int):
+    """在当前目录写入离线页面缓存与基础数据文件 (target_file)。"""
+    os.makedirs(cache_dir, exist_ok=True)
+    padding = "<div class=\"filler\">" + ("<p>历史净值 占位文本</p>" * max(1, page_kb * 1024 // 40)) + "</div>"
+    with open(config["target_file"], "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter="\t", lineterminator="\n")
+        writer.writerow(["名称", "一年涨幅(%)", "三年涨幅(%)", "规模(亿元)", "限额(元)", "买入费率(%)", "运作费率(年，%)", "零成本持有天数"])
+        for i, (code, alipay_name, tiantian_name) in enumerate(config["funds_details"]):
+            page = PAGE_TEMPLATE.format(name=tiantian_name, code=code, one_year=f"{10 + i % 17:.2f}",
+                                        three_year=f"{50 + i % 29:.2f}", scale=f"{1 + i % 97:.2f}",
+                                        tracking=f"{1 + i % 5 / 10:.2f}", padding=padding)
+            with open(os.path.join(cache_dir, f"{code}.html"), "w", encoding="utf-8") as page_file:
+                page_file.write(page)
+            writer.writerow([alipay_name, "", "", "", 100 * (1 + i % 50), 0.12, 0.6, 7 * (1 + i % 100)])
+
+
+# run_all 中被计量的阶段函数 -> 阶段名称
+RUN_ALL_STAGES = {
+    "scrape_for_config": "scrape",
+    "change_feed_for_config": "change_feed",
+    "combine_for_config": "combine",
+    "report_for_config": "report",
+}
+
+
+def _proc_status_mb(field: str):
+    """读取 /proc/self/status 中的 VmRSS / VmHWM (MB)，非 Linux 时返回 None。"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _maxrss_mb() -> float:
+    # Linux 上 ru_maxrss 的单位是 KB，macOS 上是字节
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _reset_peak_rss() -> bool:
+    """将进程的RSS峰值 (VmHWM) 重置为当前RSS，成功返回 True (Linux 4.0+)。"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _current_rss_mb() -> float:
+    current = _proc_status_mb("VmRSS")
+    return current if current is not None else _maxrss_mb()
+
+
+def _top_growth(start, end, top: int) -> list:
+    """阶段结束时相对阶段开始时净增最多的分配位置。"""
+    return [
+        {"where": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+         "size_diff_kb": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff}
+        for stat in end.compare_to(start, "lineno")[:top]
+    ]
+
+
+def _measure(stage_name: str, func, trace: bool, top: int) -> (dict, object):
+    exclude = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    if trace:
+        start_snapshot = tracemalloc.take_snapshot().filter_traces(exclude)
+        tracemalloc.reset_peak()
+        traced_start, _ = tracemalloc.get_traced_memory()
+    rss_start = _current_rss_mb()
+    peak_resettable = _reset_peak_rss()
+    maxrss_start = _maxrss_mb()
+    started = time.perf_counter()
+    result = func()
+    wall = time.perf_counter() - started
+
+    if peak_resettable and _proc_status_mb("VmHWM") is not None:
+        peak_delta, scope = _proc_status_mb("VmHWM") - rss_start, "stage"
+    else:
+        peak_delta, scope = _maxrss_mb() - maxrss_start, "process"
+    stage = {"stage": stage_name, "wall_s": round(wall, 3), "rss_start_mb": round(rss_start, 1),
+             "peak_rss_delta_mb": round(max(0.0, peak_delta), 1), "rss_scope": scope}
+    if trace:
+        _, traced_peak = tracemalloc.get_traced_memory()
+        end_snapshot = tracemalloc.take_snapshot().filter_traces(exclude)
+        # 阶段内 Python 分配的峰值 (相对阶段开始时)，以及阶段结束时净增的分配 (该阶段留下来的内存)
+        stage["traced_peak_mb"] = round((traced_peak - traced_start) / (1024 * 1024), 2)
+        stage["top_growth"] = _top_growth(start_snapshot, end_snapshot, top)
+    return stage, result
+
+
+def _instrument(module, stages: list, trace: bool, top: int):
+    """将 module 中的阶段函数替换为计量包装，每次调用的结果追加到 stages。"""
+    for func_name, stage_name in RUN_ALL_STAGES.items():
+        func = getattr(module, func_name)
+
+        def measured(*args, _func=func, _stage_name=stage_name, **kwargs):
+            stage, result = _measure(_stage_name, lambda: _func(*args, **kwargs), trace, top)
+            stages.append(stage)
+            return result
+
+        setattr(module, func_name, measured)
+
+
+def run_worker(n: int, page_kb: int, trace: bool, top: int) -> dict:
+    """在当前目录 (由父进程创建的临时目录) 内，以合成的 CONFIGS 运行一次 run_all.main()。"""
+    import run_all
+    import scraper
+
+    config = build_synthetic_config(n)
+    generate_workspace(config, scraper.CACHE_DIR, page_kb)
+    run_all.CONFIGS = {config["index_name"]: config}
+
+    stages = []
+    _instrument(run_all, stages, trace, top)
+    if trace:
+        tracemalloc.start()
+    baseline_rss = _current_rss_mb()
+    argv = sys.argv
+    sys.argv = ["run_all.py", "--index", config["index_name"]]
+    started = time.perf_counter()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            run_all.main()
+    finally:
+        sys.argv = argv
+    total_wall = time.perf_counter() - started
+    if trace:
+        tracemalloc.stop()
+
+    return {"n": n, "page_kb": page_kb, "baseline_rss_mb": round(baseline_rss, 1),
+            "total_wall_s": round(total_wall, 3), "max_rss_mb": round(_maxrss_mb(), 1), "stages": stages}
+
+
+def run_size(n: int, page_kb: int, trace: bool, top: int, keep: bool) -> dict:
+    workdir = tempfile.mkdtemp(prefix=f"fund_scale_{n}_")
+    command = [sys.executable, os.path.abspath(__file__), "--worker", str(n), "--page-kb", str(page_kb), "--top", str(top)]
+    if not trace:
+        command.append("--no-trace")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)), os.environ.get("PYTHONPATH")])))
+    try:
+        completed = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            return {"n": n, "error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else f"exit {completed.returncode}"}
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    finally:
+        if keep:
+            print(f"  - 工作目录已保留: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_summary(result: dict):
+    if "error" in result:
+        print(f"N={result['n']:>7}  [错误] {result['error']}")
+        return
+    print(f"N={result['n']:>7}  总耗时 {result['total_wall_s']:>9.3f}s  进程峰值RSS {result['max_rss_mb']:>8.1f}MB  (基线 {result['baseline_rss_mb']}MB)")
+    for stage in result["stages"]:
+        traced = f"  tracemalloc峰值 +{stage['traced_peak_mb']:.2f}MB" if "traced_peak_mb" in stage else ""
+        scope = "" if stage["rss_scope"] == "stage" else " (进程峰值增量)"
+        print(f"    {stage['stage']:<12} {stage['wall_s']:>9.3f}s  RSS峰值 +{stage['peak_rss_delta_mb']:.1f}MB{scope}"
+              f" (起始 {stage['rss_start_mb']:.1f}MB){traced}")
+        for alloc in stage.get("top_growth", []):
+            print(f"        {alloc['size_diff_kb']:>+10.1f}KB  {alloc['count_diff']:>+8} {alloc['where']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="run_all 流程的内存与耗时规模测试。")
+    parser.add_argument('-n', '--sizes', type=str, default=DEFAULT_SIZES, help="逗号分隔的基金数量列表。")
+    parser.add_argument('--page-kb', type=int, default=DEFAULT_PAGE_KB, help="每个合成页面的大致大小 (KB)。")
+    parser.add_argument('--top', type=int, default=TOP_ALLOCATORS, help="每个阶段列出的主要分配位置数量。")
+    parser.add_argument('--no-trace', action='store_true', help="关闭 tracemalloc (大规模时 tracemalloc 本身开销明显)。")
+    parser.add_argument('--keep', action='store_true', help="保留每个规模的临时工作目录。")
+    parser.add_argument('-o', '--output', type=str, help="将全部结果写入JSON文件。")
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(run_worker(args.worker, args.page_kb, not args.no_trace, args.top), ensure_ascii=False))
+        sys.exit(0)
+
+    print("===== 执行规模测试 =====")
+    results = []
+    for n in (int(size) for size in args.sizes.split(",")):
+        print(f"\n--- N={n} ---")
+        result = run_size(n, args.page_kb, not args.no_trace, args.top, args.keep)
+        print_summary(result)
+        results.append(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 '{args.output}'。")
+    print("===== 规模测试已完成 =====")
@@ -13,14 +13,91 @@ import time
 import os
 import re
 import csv
-from config import CONFIGS # <-- 导入中央配置
+import codecs
+from html.parser import HTMLParser
+from config import CONFIGS, iter_share_classes # <-- 导入中央配置
+from nav_history import nav_returns_for_fund, format_return
+from cache_snapshot import Snapshot
 
 # --- 全局配置 ---
 CACHE_DIR = "cache"
 CACHE_EXPIRATION_SECONDS = 3600
+# 流式抓取: 读到 parse_fund_data 需要的全部区块后即断开连接，只缓存已读取的部分
+# (配置了兄弟份额的主份额除外，见 scrape_for_config)
+STREAMING_FETCH = False
+STREAM_CHUNK_SIZE = 16 * 1024
+TRUNCATED_MARKER = "<!-- truncated: streaming fetch stopped after required sections -->"
+# “抓取时间”列的格式，与 fund_store 中 dynamics.updated_at 一致
+FETCHED_AT_FORMAT = "%Y-%m-%dT%H:%M:%S"
+# parse_fund_data 依赖的区块: (标签, class)
+REQUIRED_SECTIONS = [("div", "fundDetail-tit"), ("dl", "dataItem01"), ("dl", "dataItem02"), ("div", "infoOfFund")]
+# 已挂载的只读快照 (见 cache_snapshot.py)；本地缓存失效时优先从快照读取，而不是访问网络
+SNAPSHOT = None
+
+def attach_snapshot(archive_path: str):
+    global SNAPSHOT
+    SNAPSHOT = Snapshot(archive_path)
+    print(f"已挂载缓存快照: '{archive_path}' (创建于 {SNAPSHOT.manifest()['created_at']})")
+    # 净值历史体积小且需要整体读取，本地缺失的直接解压，供 --nav-history 复现使用
+    restored = SNAPSHOT.restore_nav_history()
+    if restored:
+        print(f"已从快照恢复 {restored} 个净值历史文件。")
+
+class _SectionTracker(HTMLParser):
+    """增量解析HTML，记录 REQUIRED_SECTIONS 中的每个区块是否已经完整闭合。"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.pending = set(REQUIRED_SECTIONS)
+        self._open = []  # [(区块, 标签, 嵌套深度)]
+
+    @property
+    def done(self) -> bool:
+        return not self.pending
+
+    def handle_starttag(self, tag, attrs):
+        for entry in self._open:
+            if entry[1] == tag:
+                entry[2] += 1
+        classes = (dict(attrs).get("class") or "").split()
+        for section in self.pending:
+            if section[0] == tag and section[1] in classes:
+                self._open.append([section, tag, 1])
+                break
+
+    def handle_endtag(self, tag):
+        for entry in list(self._open):
+            if entry[1] != tag:
+                continue
+            entry[2] -= 1
+            if entry[2] == 0:
+                self._open.remove(entry)
+                self.pending.discard(entry[0])
+
+def _stream_required_sections(response) -> (str, bool):
+    """逐块读取响应并送入增量解析器，所需区块全部闭合后立即停止。返回 (已读取的HTML, 是否提前截断)。"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    tracker = _SectionTracker()
+    parts = []
+    for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+        text = decoder.decode(chunk)
+        parts.append(text)
+        tracker.feed(text)
+        if tracker.done:
+            return "".join(parts), True
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts), False
 
 # --- 核心函数 (逻辑基本不变) ---
-def get_page_html(fund_code: str) -> (str, str):
+def get_page_html(fund_code: str, streaming: bool = None) -> (str, str):
+    """
+    获取基金页面HTML，依次尝试本地缓存、已挂载的快照和网络。
+    streaming (默认取 STREAMING_FETCH) 为 True 时使用流式抓取，截断的页面在缓存末尾带有 TRUNCATED_MARKER。
+    兄弟份额的链接位于 REQUIRED_SECTIONS 之后，提前截断会丢失这部分内容，
+    因此 scrape_for_config 对配置了兄弟份额的主份额总是传入 streaming=False，完整读取页面。
+    streaming 为 False 时，以 TRUNCATED_MARKER 结尾的缓存视为未命中，重新读取完整页面。
+    """
+    streaming = STREAMING_FETCH if streaming is None else streaming
     os.makedirs(CACHE_DIR, exist_ok=True)
     cache_filepath = os.path.join(CACHE_DIR, f"{fund_code}.html")
 
@@ -28,23 +105,91 @@ def get_page_html(fund_code: str) -> (str, str):
         file_mod_time = os.path.getmtime(cache_filepath)
         if (time.time() - file_mod_time) < CACHE_EXPIRATION_SECONDS:
             with open(cache_filepath, 'r', encoding='utf-8') as f:
-                return f.read(), 'cache'
+                html_content = f.read()
+            # 流式抓取截断的页面缺少后部内容 (如兄弟份额区块)，非流式请求时视为未命中
+            if streaming or not html_content.endswith(TRUNCATED_MARKER):
+                return html_content, 'cache'
+
+    if SNAPSHOT is not None:
+        html_content = SNAPSHOT.read_page(fund_code)
+        if html_content is not None:
+            return html_content, 'snapshot'
 
     url = f"http://fund.eastmoney.com/{fund_code}.html"
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        response.encoding = 'utf-8'
-        html_content = response.text
+        if streaming:
+            with requests.get(url, headers=headers, timeout=10, stream=True) as response:
+                response.raise_for_status()
+                html_content, truncated = _stream_required_sections(response)
+            if truncated:
+                html_content += TRUNCATED_MARKER
+        else:
+            response = requests.get(url, headers=headers, timeout=10)
+            response.raise_for_status()
+            response.encoding = 'utf-8'
+            html_content = response.text
         with open(cache_filepath, 'w', encoding='utf-8') as f: f.write(html_content)
         return html_content, 'network'
     except requests.exceptions.RequestException as e:
         return None, f"网络请求错误: {e}"
 
-def parse_fund_data(html_content: str, expected_name: str, fund_code: str) -> dict:
-    data = { "抓取到的标题": "", "近一年": "", "近三年": "", "规模及日期": "", "跟踪信息": "", "错误信息": None }
+def _fetched_at(fund_code: str, source: str) -> str:
+    """页面内容的获取时间: 缓存取文件修改时间，快照取打包时的页面时间，网络取当前时间。"""
+    timestamp = None
+    if source == 'cache':
+        timestamp = os.path.getmtime(os.path.join(CACHE_DIR, f"{fund_code}.html"))
+    elif source == 'snapshot':
+        timestamp = SNAPSHOT.page_time(fund_code)
+    return time.strftime(FETCHED_AT_FORMAT, time.localtime(timestamp))
+
+def _previous_fetch_times(source_file: str) -> dict:
+    """读取上一次 source_file 中的 {基金代码: 抓取时间}，文件不存在或没有该列时为空。"""
+    if not os.path.exists(source_file):
+        return {}
+    with open(source_file, 'r', encoding='utf-8-sig', newline='') as f:
+        return {row['基金代码']: row.get('抓取时间') or '' for row in csv.DictReader(f, delimiter='\t')}
+
+def _parse_sibling_data(soup, siblings: dict, tracking_info: str, source_code: str) -> dict:
+    """
+    在主份额页面中查找兄弟份额 (siblings: {基金代码: 天天基金名称}) 的链接，
+    若链接所在的区块同时给出了近1年与规模，则直接提取；数据不完整的份额不返回，由调用方单独抓取。
+    “抓取到的标题”原样保存链接文字，“数据来源”记为 sibling:<主份额代码>，以便与单独抓取的行区分。
+    跟踪标的与跟踪误差由同一投资组合决定，沿用主份额的值。
+    """
+    results = {}
+    for code, expected_name in siblings.items():
+        for link in soup.find_all('a', href=re.compile(rf"\b{code}\.html")):
+            container = link.find_parent(['tr', 'li', 'dl', 'div'])
+            if container is None:
+                continue
+            text = container.get_text(" ", strip=True)
+            title = link.get_text(strip=True)
+            if not title.startswith(expected_name):
+                continue
+            one_year = re.search(r"近1年：?\s*(-?[\d.]+%?)", text)
+            three_year = re.search(r"近3年：?\s*(-?[\d.]+%?|--)", text)
+            scale = re.search(r"规模：?\s*([\d.]+亿元(?:（[\d-]+）)?)", text)
+            if one_year and scale:
+                results[code] = {
+                    "抓取到的标题": title,
+                    "近一年": one_year.group(1),
+                    "近三年": three_year.group(1) if three_year else "",
+                    "规模及日期": scale.group(1),
+                    "跟踪信息": tracking_info,
+                    "错误信息": None,
+                    "数据来源": f"sibling:{source_code}",
+                }
+                break
+    return results
+
+def parse_fund_data(html_content: str, expected_name: str, fund_code: str, siblings: dict = None) -> dict:
+    """
+    解析基金页面。传入 siblings ({基金代码: 天天基金名称}) 时，
+    额外在 data["同组份额"] 中返回页面内能完整提取的兄弟份额数据。
+    """
+    data = { "抓取到的标题": "", "近一年": "", "近三年": "", "规模及日期": "", "跟踪信息": "", "错误信息": None, "同组份额": {} }
     try:
         soup = BeautifulSoup(html_content, 'lxml')
         title_tag = soup.find('div', class_='fundDetail-tit')
@@ -79,42 +224,67 @@ def parse_fund_data(html_content: str, expected_name: str, fund_code: str) -> di
             special_data_td = info_div.find('td', class_='specialData')
             if special_data_td:
                 data['跟踪信息'] = special_data_td.get_text(strip=True)
+
+        if siblings:
+            data["同组份额"] = _parse_sibling_data(soup, siblings, data['跟踪信息'], fund_code)
         
         return data
     except Exception as e:
         data["错误信息"] = f"HTML解析时发生未知错误: {e}"
         return data
 
-def scrape_for_config(config: dict):
+def scrape_for_config(config: dict, use_nav_history: bool = False):
     """
     根据传入的配置对象，执行抓取任务。
+    返回本次抓取的记录列表 (每只基金一个 dict，键与TSV表头一致)，供变更检测等下游步骤使用。
+    use_nav_history 为 True 时，近一年/近三年改用本地净值历史计算 (见 nav_history.py)。
     """
     index_name = config["index_name"]
     output_tsv_file = config["source_file"]
-    funds_details = config["funds_details"]
+    share_classes = config.get("share_classes", {})
     
     print(f"--- 开始为 '{index_name}' 指数执行数据抓取 ---")
     
-    headers = ["基金代码", "基金名称", "抓取到的标题", "近一年", "近三年", "规模及日期", "跟踪信息"]
+    # 数据来源: cache / network / snapshot / sibling:<主份额代码>，用于追溯每一行的出处
+    # 抓取时间: 该行数据对应页面的获取时间 (兄弟份额沿用主份额页面)；失败的行沿用上一次 source_file 中的值，
+    #          即最后一次成功抓取的时间。staleness.py 据此计算数据年龄
+    headers = ["基金代码", "基金名称", "抓取到的标题", "近一年", "近三年", "规模及日期", "跟踪信息", "数据来源", "抓取时间"]
+    records = []
+    # 从主份额页面中提取到的兄弟份额数据，处理到该份额时直接使用，免去一次请求
+    sibling_data = {}
+    previous_fetch_times = _previous_fetch_times(output_tsv_file)
     
     with open(output_tsv_file, 'w', newline='', encoding='utf-8-sig') as tsvfile:
         writer = csv.writer(tsvfile, delimiter='\t')
         writer.writerow(headers)
 
-        # 从配置中读取基金列表
-        for fund_code, alipay_name, tiantian_name in funds_details:
+        # 从配置中读取基金列表 (主份额之后紧跟其兄弟份额)
+        for fund_code, alipay_name, tiantian_name in iter_share_classes(config):
             print(f"\n处理基金: {tiantian_name} ({fund_code})")
             
-            html, source_or_error = get_page_html(fund_code)
-            
             # 使用天天基金的名称作为写入TSV的“基金名称”列，用于后续匹配
-            row_to_write = [fund_code, tiantian_name, '', '', '', '', ''] 
+            row_to_write = [fund_code, tiantian_name, '', '', '', '', '', '', ''] 
+
+            parsed_data = sibling_data.pop(fund_code, None)
+            if parsed_data is not None:
+                source_or_error = parsed_data["数据来源"]
+                fetched_at = parsed_data["抓取时间"]
+                print(f"  - [复用] 已从主份额页面取得数据，跳过请求。")
+            else:
+                siblings = {code: name for code, _, name in share_classes.get(fund_code, [])}
+                # 有兄弟份额时关闭流式截断，否则页面后部的兄弟份额区块读不到，复用会全部退化为单独请求
+                html, source_or_error = get_page_html(fund_code, streaming=False if siblings else None)
+                if html:
+                    fetched_at = _fetched_at(fund_code, source_or_error)
+                    # 使用天天基金的名称进行页面校验
+                    parsed_data = parse_fund_data(html, tiantian_name, fund_code, siblings=siblings)
+                    for sibling in parsed_data["同组份额"].values():
+                        sibling["抓取时间"] = fetched_at
+                    sibling_data.update(parsed_data["同组份额"])
             
-            if html:
-                # 使用天天基金的名称进行页面校验
-                parsed_data = parse_fund_data(html, tiantian_name, fund_code)
-                
+            if parsed_data is not None:
                 row_to_write[2] = parsed_data['抓取到的标题']
+                row_to_write[7] = source_or_error
                 if parsed_data.get("错误信息"):
                     error_msg = parsed_data["错误信息"]
                     print(f"  - [错误] {error_msg}")
@@ -128,14 +298,28 @@ def scrape_for_config(config: dict):
                         parsed_data['近一年'],
                         parsed_data['近三年'],
                         parsed_data['规模及日期'],
-                        parsed_data['跟踪信息']
+                        parsed_data['跟踪信息'],
+                        source_or_error,
+                        fetched_at
                     ]
+                    if use_nav_history:
+                        returns, nav_error = nav_returns_for_fund(fund_code)
+                        if nav_error:
+                            print(f"  - [警告] {nav_error}，保留页面上的收益率。")
+                        else:
+                            for column, col_idx in (("近一年", 3), ("近三年", 4)):
+                                if returns[column] is not None:
+                                    row_to_write[col_idx] = format_return(returns[column])
+                            print(f"  - [成功] 已用本地净值历史计算收益率。")
             else:
                 error_msg = source_or_error
                 print(f"  - [错误] {error_msg}")
                 row_to_write[3] = f"网络错误: {error_msg}"
 
+            if not row_to_write[8]:
+                row_to_write[8] = previous_fetch_times.get(fund_code, '')
             writer.writerow(row_to_write)
+            records.append(dict(zip(headers, row_to_write)))
             print(f"  - [写入] 已将记录写入到 {output_tsv_file}")
 
             if source_or_error == 'network':
@@ -143,6 +327,7 @@ def scrape_for_config(config: dict):
     
     print(f"\n--- '{index_name}' 指数抓取任务执行完毕 ---")
     print(f"报告文件 '{output_tsv_file}' 已生成。")
+    return records
 
 
 if __name__ == '__main__':
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# -------------------------------------------------------------------------
+# Mission:  为 stale-while-revalidate 模式提供辅助函数：
+#           计算每只基金数据的“年龄”，以及判断刷新前后数据是否发生变化。
+#
+#  数据年龄取自每行数据的生成时间: 使用工作库时为 dynamics.updated_at，
+#  否则为 source_file 中由 scraper.py 写入的“抓取时间”列 (兄弟份额与快照中的行同样带有该时间)。
+# -------------------------------------------------------------------------
+import csv
+import hashlib
+import os
+import time
+from config import iter_share_classes
+from scraper import CACHE_EXPIRATION_SECONDS, FETCHED_AT_FORMAT
+
+
+def _fetched_times(config: dict, store=None) -> dict:
+    """返回 {支付宝名称: 抓取时间字符串或 None}。"""
+    if store is not None:
+        return store.updated_times(config["index_name"])
+    times = {}
+    if os.path.exists(config["source_file"]):
+        with open(config["source_file"], "r", encoding="utf-8-sig", newline="") as f:
+            times = {row["基金代码"]: row.get("抓取时间") for row in csv.DictReader(f, delimiter="\t")}
+    return {alipay_name: times.get(fund_code) for fund_code, alipay_name, _ in iter_share_classes(config)}
+
+
+def fund_ages(config: dict, now: float = None, store=None) -> dict:
+    """返回 {支付宝名称: 数据年龄(秒)}；从未成功抓取过的基金为 None。"""
+    now = now if now is not None else time.time()
+    ages = {}
+    for name, fetched_at in _fetched_times(config, store).items():
+        try:
+            ages[name] = now - time.mktime(time.strptime(fetched_at, FETCHED_AT_FORMAT))
+        except (TypeError, ValueError):
+            ages[name] = None
+    return ages
+
+
+def stale_names(config: dict, store=None) -> set:
+    """数据已超过缓存有效期 (或从未抓取) 的基金名称集合。"""
+    return {name for name, age in fund_ages(config, store=store).items() if age is None or age >= CACHE_EXPIRATION_SECONDS}
+
+
+def format_age(age_seconds) -> str:
+    """'12分钟前'、'3小时前 (过期)'；超过缓存有效期的数据标记为过期。"""
+    if age_seconds is None:
+        return "未知 (过期)"
+    if age_seconds < 3600:
+        label = f"{max(1, int(age_seconds // 60))}分钟前"
+    elif age_seconds < 86400:
+        label = f"{int(age_seconds // 3600)}小时前"
+    else:
+        label = f"{int(age_seconds // 86400)}天前"
+    return f"{label} (过期)" if age_seconds >= CACHE_EXPIRATION_SECONDS else label
+
+
+def data_fingerprint(config: dict, store=None) -> str:
+    """报告输入数据的指纹，用于判断刷新后是否需要重新发布。"""
+    digest = hashlib.sha1()
+    if store is not None:
+        headers, rows = store.fetch_rows(config["index_name"])
+        digest.update(repr((headers, rows)).encode("utf-8"))
+    elif os.path.exists(config["target_file"]):
+        with open(config["target_file"], "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
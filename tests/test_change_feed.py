@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# change_feed: 单次解析失败的字段不应产生事件，也不应移动基准。
+from change_feed import CHANGE_FEED_THRESHOLDS, advance_digest, diff_digest, fund_digest
+
+RECORD = {"基金代码": "900000", "近一年": "20.79%", "近三年": "--", "规模及日期": "16.54亿元（2025-06-30）",
+          "跟踪信息": "跟踪标的：纳斯达克100指数 |年化跟踪误差：1.21%"}
+
+
+def run(previous, record):
+    current = fund_digest(record)
+    changes = diff_digest(previous, current, CHANGE_FEED_THRESHOLDS)
+    return changes, (advance_digest(previous, current, changes) if changes else previous)
+
+
+def test_parse_glitch_keeps_baseline():
+    baseline = fund_digest(RECORD)
+
+    changes, digest = run(baseline, dict(RECORD, 规模及日期=""))
+    assert changes == {}
+    assert digest == baseline
+
+    changes, digest = run(digest, RECORD)
+    assert changes == {}
+    assert digest == baseline
+
+
+def test_value_appearing_is_reported_once():
+    baseline = fund_digest(RECORD)
+    changes, digest = run(baseline, dict(RECORD, 近三年="60.12%"))
+    assert changes == {"近三年": {"old": None, "new": 60.12, "delta": None}}
+
+    changes, _ = run(digest, dict(RECORD, 近三年="60.12%"))
+    assert changes == {}
+
+
+def test_threshold_change_advances_only_reported_field():
+    baseline = fund_digest(RECORD)
+    changes, digest = run(baseline, dict(RECORD, 近一年="22.00%", 规模及日期="16.60亿元"))
+    assert set(changes) == {"近一年"}
+    assert digest["values"]["近一年"] == 22.0
+    assert digest["values"]["规模"] == 16.54
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# fund_query: 无效的条件、排序列与输出列应给出明确的错误信息，而不是抛出异常堆栈。
+import argparse
+
+import numpy as np
+import pytest
+
+from fund_query import FundTable, add_query_arguments, run_query
+
+
+@pytest.fixture
+def table():
+    return FundTable({
+        '指数': np.array(['nasdaq', 'nasdaq', 'sp500'], dtype=object),
+        '名称': np.array(['基金A', '基金B', '基金C'], dtype=object),
+        '一年涨幅': np.array([20.5, np.nan, 12.0]),
+        '三年涨幅': np.array([60.0, 45.0, 30.0]),
+        '规模': np.array([16.5, 3.2, 8.0]),
+        '限额': np.array([100.0, 1000.0, 5000.0]),
+        '买入费率': np.array([0.12, 0.1, 0.12]),
+        '运作费率': np.array([0.6, 0.8, 0.65]),
+        '天数': np.array([7.0, 30.0, 14.0]),
+    })
+
+
+def parse_query_args(argv):
+    parser = argparse.ArgumentParser()
+    add_query_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def test_query_filters_and_sorts(table):
+    rows = table.query(["限额>=1000"], sort_by="一年涨幅", limit=5)
+    assert [row['名称'] for row in rows] == ['基金C', '基金B']
+    assert rows[1]['一年涨幅'] is None
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"conditions": ["限额>=abc"]}, "比较值必须是数字"),
+    ({"conditions": ["费用>=1"]}, "未知列: 费用"),
+    ({"sort_by": "名称"}, "只能按数值列排序: 名称"),
+    ({"sort_by": "费用"}, "未知列: 费用"),
+    ({"columns": ["名称", "费用"]}, "未知列: 费用"),
+])
+def test_invalid_query_raises_value_error(table, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        table.query(**kwargs)
+
+
+def test_run_query_prints_error(monkeypatch, capsys, table):
+    monkeypatch.setattr(FundTable, "load", classmethod(lambda cls, configs=None, store=None: table))
+
+    assert run_query(parse_query_args(["-s", "名称"])) is False
+    assert capsys.readouterr().out.startswith("错误：只能按数值列排序")
+
+    assert run_query(parse_query_args(["-w", "限额>=1000", "-s", "一年涨幅", "-k", "1"])) is True
+    assert "基金C" in capsys.readouterr().out
+
+
+def test_index_and_store_options_after_query():
+    args = parse_query_args(["-i", "nasdaq", "--store", "-k", "3"])
+    assert args.index == "nasdaq" and args.store is True
+
+    # 未在 query 之后给出时不设置属性，保留 run_all.py 顶层参数的值
+    args = parse_query_args(["-k", "3"])
+    assert not hasattr(args, "index") and not hasattr(args, "store")
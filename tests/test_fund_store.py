@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# fund_store: 手动编辑 target_file 后不被导出覆盖；配置中改名的基金沿用原有行；缺少 target_file 时不抛异常。
+import csv
+import os
+
+import pytest
+
+from combiner import combine_for_config
+from fund_store import FundStore, ensure_store
+
+HEADER = ["名称", "一年涨幅(%)", "三年涨幅(%)", "规模(亿元)", "限额(元)", "买入费率(%)", "运作费率(年，%)", "零成本持有天数"]
+
+
+def make_config(name="测试纳斯达克100(QDII)A"):
+    return {
+        "index_name": "test",
+        "funds_details": [("900000", name, "测试纳斯达克100指数发起(QDII)A")],
+        "share_classes": {},
+        "source_file": "test_scraped_details.tsv",
+        "target_file": "test_fund_data.tsv",
+    }
+
+
+RECORD = {"基金代码": "900000", "基金名称": "测试纳斯达克100指数发起(QDII)A", "近一年": "21.00%", "近三年": "",
+          "规模及日期": "16.54亿元（2025-06-30）", "跟踪信息": "", "抓取时间": "2025-06-30T15:00:00"}
+
+
+def write_target(rows):
+    with open("test_fund_data.tsv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter="\t", lineterminator="\n")
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def read_target():
+    with open("test_fund_data.tsv", encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f, delimiter="\t"))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_target([["测试纳斯达克100(QDII)A", "20.79%", "--", "16.54亿元", "100", "0.1", "0.6", "365"]])
+    return tmp_path
+
+
+def test_hand_edit_survives_store_export(workdir):
+    config = make_config()
+    store = ensure_store(config, "store.db")
+    combine_for_config(config, store=store, records=[RECORD])
+    assert read_target()[0]["限额(元)"] == "100"
+
+    rows = read_target()
+    rows[0]["限额(元)"] = "999999"
+    write_target([list(row.values()) for row in rows])
+    os.utime("test_fund_data.tsv", ns=(os.stat("store.db").st_mtime_ns + 10**9,) * 2)
+
+    combine_for_config(config, store=store, records=[dict(RECORD, 近一年="22.00%")])
+    row = read_target()[0]
+    assert row["限额(元)"] == "999999"
+    assert row["一年涨幅(%)"] == "22.00%"
+    assert store.updated_times("test") == {"测试纳斯达克100(QDII)A": "2025-06-30T15:00:00"}
+    store.close()
+
+
+def test_renamed_fund_keeps_its_row(workdir):
+    with ensure_store(make_config(), "store.db") as store:
+        store.upsert_dynamics([RECORD])
+
+    with ensure_store(make_config("测试纳斯达克100指数(QDII)A"), "store.db") as store:
+        headers, rows = store.fetch_rows("test")
+    assert len(rows) == 1
+    assert rows[0][0] == "测试纳斯达克100指数(QDII)A"
+    assert rows[0][1] == "21.00%"
+    assert rows[0][4] == "100"
+
+
+def test_missing_target_file(workdir, capsys):
+    os.remove("test_fund_data.tsv")
+    assert ensure_store(make_config(), "store.db") is None
+    assert "错误：文件未找到" in capsys.readouterr().out
+    with FundStore("store.db") as store:
+        with pytest.raises(FileNotFoundError):
+            store.import_tsv(make_config())
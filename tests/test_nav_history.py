@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+# 使用本地 http.server 模拟天天基金 f10/lsjz 接口，验证净值历史的增量抓取与收益率计算。
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+import nav_history
+
+TODAY = datetime.date.today()
+
+
+def make_series(days: int, start_offset: int = 0) -> list:
+    """生成最近若干天的 (日期, 单位净值, 累计净值)，日期升序。"""
+    rows = []
+    for i in range(days):
+        date = TODAY - datetime.timedelta(days=start_offset + days - 1 - i)
+        nav = f"{1 + i / 100:.4f}"
+        rows.append((date.isoformat(), nav, nav))
+    return rows
+
+
+class FixtureServer:
+    """按 fundCode/startDate/endDate/pageIndex/pageSize 分页返回 LSJZList (与真实接口一样按日期降序)。"""
+
+    def __init__(self):
+        self.series = {}
+        self.failing = set()
+        self.requests = []
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                fixture.requests.append(params)
+                code = params["fundCode"]
+                if code in fixture.failing:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                rows = [row for row in fixture.series.get(code, [])
+                        if params["startDate"] <= row[0] <= params["endDate"]]
+                rows.sort(key=lambda row: row[0], reverse=True)
+                page_index, page_size = int(params["pageIndex"]), int(params["pageSize"])
+                page = rows[(page_index - 1) * page_size: page_index * page_size]
+                body = json.dumps({
+                    "Data": {"LSJZList": [{"FSRQ": d, "DWJZ": dw, "LJJZ": lj} for d, dw, lj in page]},
+                    "ErrCode": 0, "TotalCount": len(rows), "PageSize": page_size, "PageIndex": page_index,
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/f10/lsjz"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def requests_for(self, code: str) -> list:
+        return [r for r in self.requests if r["fundCode"] == code]
+
+
+@pytest.fixture
+def fixture_server(tmp_path, monkeypatch):
+    server = FixtureServer()
+    server.thread.start()
+    monkeypatch.setattr(nav_history, "NAV_API_URL", server.url)
+    monkeypatch.setattr(nav_history, "NAV_HISTORY_DIR", str(tmp_path / "nav_history"))
+    monkeypatch.setattr(nav_history, "NAV_PAGE_SIZE", 3)
+    monkeypatch.setattr(nav_history, "NAV_REQUEST_INTERVAL_SECONDS", 0)
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+def test_initial_backfill(fixture_server):
+    fixture_server.series["000001"] = make_series(8)
+
+    added, error = nav_history.update_nav_history("000001")
+
+    assert error is None
+    assert added == 8
+    assert nav_history.last_stored_date("000001") == TODAY
+    history = nav_history.load_nav_history("000001")
+    assert list(history["日期"].dt.date.astype(str)) == [row[0] for row in make_series(8)]
+    first = fixture_server.requests_for("000001")[0]
+    assert first["startDate"] == (TODAY - datetime.timedelta(days=nav_history.BACKFILL_DAYS)).isoformat()
+
+
+def test_incremental_fetch_only_requests_new_dates(fixture_server):
+    fixture_server.series["000002"] = make_series(5, start_offset=3)
+    nav_history.update_nav_history("000002")
+    last_date = nav_history.last_stored_date("000002")
+    assert last_date == TODAY - datetime.timedelta(days=3)
+
+    fixture_server.series["000002"] = make_series(8)
+    fixture_server.requests.clear()
+    added, error = nav_history.update_nav_history("000002")
+
+    assert error is None
+    assert added == 3
+    assert all(r["startDate"] == (last_date + datetime.timedelta(days=1)).isoformat()
+               for r in fixture_server.requests_for("000002"))
+    history = nav_history.load_nav_history("000002")
+    assert len(history) == 8
+    assert history["日期"].is_monotonic_increasing
+
+
+def test_up_to_date_history_makes_no_request(fixture_server):
+    fixture_server.series["000003"] = make_series(2)
+    nav_history.update_nav_history("000003")
+    fixture_server.requests.clear()
+
+    assert nav_history.update_nav_history("000003") == (0, None)
+    assert fixture_server.requests == []
+
+
+@pytest.mark.parametrize("days, expected_pages", [(6, 2), (7, 3), (2, 1)])
+def test_pagination_stops_at_total_count(fixture_server, days, expected_pages):
+    fixture_server.series["000004"] = make_series(days)
+
+    rows = nav_history.fetch_nav_since("000004", TODAY - datetime.timedelta(days=30), TODAY)
+
+    assert len(rows) == days
+    assert rows == sorted(rows)
+    assert [int(r["pageIndex"]) for r in fixture_server.requests_for("000004")] == list(range(1, expected_pages + 1))
+
+
+def test_error_path_reports_request_error(fixture_server):
+    fixture_server.failing.add("000005")
+
+    added, error = nav_history.update_nav_history("000005")
+
+    assert added == 0
+    assert error.startswith("净值接口请求错误")
+    assert nav_history.last_stored_date("000005") is None
+
+
+def test_compute_returns_on_known_series():
+    history = pd.DataFrame({
+        "日期": pd.to_datetime(["2024-01-02", "2024-06-03", "2025-01-02", "2025-06-02"]),
+        "单位净值": [1.0, 1.1, 1.2, 1.5],
+        "累计净值": [1.0, 1.1, 1.2, 1.5],
+    })
+
+    returns = nav_history.compute_returns(history, {"近一年": 365, "近两年": 730})
+    # 2025-06-02 往前 365 天为 2024-06-02，取当天或之前最近的净值 (2024-01-02 的 1.0)
+    assert returns["近一年"] == pytest.approx(50.0)
+    # 起点早于第一条记录 -> None
+    assert returns["近两年"] is None
+
+    as_of = nav_history.compute_returns(history, {"近一年": 365}, as_of="2025-03-01")
+    # 截止 2025-01-02 (1.2)，起点 2024-01-03 之前最近的是 2024-01-02 (1.0)
+    assert as_of["近一年"] == pytest.approx(20.0)
+    assert nav_history.compute_returns(history, {"近一年": 365}, as_of="2023-01-01") == {"近一年": None}
+    assert nav_history.format_return(returns["近一年"]) == "50.00%"
+    assert nav_history.format_return(None) == "--"
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# report_server: Accept-Encoding 的 q 值解析。
+import pytest
+
+from report_server import _accepts_gzip
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True),
+    ("gzip, deflate, br", True),
+    ("br;q=1.0, gzip;q=0.8", True),
+    ("*", True),
+    ("", False),
+    ("identity", False),
+    ("gzip;q=0", False),
+    ("GZIP; q=0.0, identity", False),
+    ("*;q=0, identity", False),
+    ("gzip;q=0, *", False),
+    ("deflate, *;q=0.1", True),
+])
+def test_accepts_gzip(header, expected):
+    assert _accepts_gzip(header) is expected
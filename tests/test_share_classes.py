@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# 份额类别分组: 主份额页面中带有完整数据的兄弟份额直接复用，数据不完整的兄弟份额单独抓取。
+import os
+
+import pytest
+
+import scraper
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGES = {
+    "900000": "primary_with_siblings.html",
+    "900002": "sibling_standalone.html",
+}
+
+CONFIG = {
+    "index_name": "test",
+    "funds_details": [("900000", "测试纳斯达克100指数(QDII)A", "测试纳斯达克100指数发起(QDII)A")],
+    "share_classes": {
+        "900000": [
+            ("900001", "测试纳斯达克100指数(QDII)C", "测试纳斯达克100指数发起(QDII)C"),
+            ("900002", "测试纳斯达克100指数(QDII)E", "测试纳斯达克100指数发起(QDII)E"),
+        ],
+    },
+    "source_file": "test_scraped_details.tsv",
+}
+
+
+def read_fixture(code: str) -> str:
+    with open(os.path.join(FIXTURES, PAGES[code]), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def fetched(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+
+    def fake_get_page_html(fund_code, streaming=None):
+        calls.append((fund_code, streaming))
+        return read_fixture(fund_code), "network"
+
+    monkeypatch.setattr(scraper, "get_page_html", fake_get_page_html)
+    monkeypatch.setattr(scraper.time, "sleep", lambda seconds: None)
+    return calls
+
+
+def test_parse_sibling_block_keeps_link_text():
+    data = scraper.parse_fund_data(read_fixture("900000"), "测试纳斯达克100指数发起(QDII)A", "900000",
+                                   siblings={"900001": "测试纳斯达克100指数发起(QDII)C",
+                                             "900002": "测试纳斯达克100指数发起(QDII)E"})
+
+    assert data["错误信息"] is None
+    assert set(data["同组份额"]) == {"900001"}
+    sibling = data["同组份额"]["900001"]
+    assert sibling["抓取到的标题"] == "测试纳斯达克100指数发起(QDII)C"
+    assert sibling["近一年"] == "20.31%"
+    assert sibling["近三年"] == "--"
+    assert sibling["规模及日期"] == "8.02亿元（2025-06-30）"
+    assert sibling["跟踪信息"] == data["跟踪信息"]
+    assert sibling["数据来源"] == "sibling:900000"
+
+
+def test_scrape_reuses_sibling_and_falls_back_to_fetch(fetched):
+    records = scraper.scrape_for_config(CONFIG)
+
+    # 900001 从主份额页面复用，900002 页面中没有数据，需要单独请求
+    assert [code for code, _ in fetched] == ["900000", "900002"]
+    by_code = {record["基金代码"]: record for record in records}
+    assert [record["基金代码"] for record in records] == ["900000", "900001", "900002"]
+    assert by_code["900000"]["数据来源"] == "network"
+    assert by_code["900001"]["数据来源"] == "sibling:900000"
+    assert by_code["900001"]["近一年"] == "20.31%"
+    assert by_code["900002"]["数据来源"] == "network"
+    assert by_code["900002"]["近一年"] == "20.55%"
+    assert by_code["900002"]["规模及日期"] == "0.42亿元（2025-06-30）"
+
+
+def test_primary_with_siblings_is_never_truncated(fetched, monkeypatch):
+    monkeypatch.setattr(scraper, "STREAMING_FETCH", True)
+    scraper.scrape_for_config(CONFIG)
+
+    # 主份额关闭流式截断以读到兄弟份额区块；没有兄弟份额的基金沿用全局设置
+    assert fetched == [("900000", False), ("900002", None)]
+
+
+def test_truncated_stream_loses_sibling_block():
+    html = read_fixture("900000")
+
+    class FakeResponse:
+        def iter_content(self, chunk_size):
+            data = html.encode("utf-8")
+            for start in range(0, len(data), 64):
+                yield data[start:start + 64]
+
+    truncated_html, truncated = scraper._stream_required_sections(FakeResponse())
+    assert truncated
+    assert "900001.html" not in truncated_html
+
+
+def test_new_share_classes_reach_target_and_report(fetched, tmp_path):
+    from combiner import combine_for_config
+    from fund_store import ensure_store
+    from reporter import report_for_config
+
+    config = dict(CONFIG, target_file="test_fund_data.tsv", output_report_file="test_report.html",
+                  report_title="测试")
+    base = ("名称\t一年涨幅(%)\t三年涨幅(%)\t规模(亿元)\t限额(元)\t买入费率(%)\t运作费率(年，%)\t零成本持有天数\n"
+            "测试纳斯达克100指数(QDII)A\t\t\t\t100\t0.1\t0.6\t365\n")
+    records = scraper.scrape_for_config(config)
+
+    outputs = {}
+    for mode in ("tsv", "store"):
+        with open(config["target_file"], "w", encoding="utf-8") as f:
+            f.write(base)
+        store = ensure_store(config, str(tmp_path / f"{mode}.db")) if mode == "store" else None
+        combine_for_config(config, store=store, records=records)
+        with open(config["target_file"], encoding="utf-8") as f:
+            outputs[mode] = f.read()
+        report_for_config(config, store=store)
+        if store is not None:
+            store.close()
+        with open(config["output_report_file"], encoding="utf-8") as f:
+            report = f.read()
+        assert "测试纳斯达克100指数(QDII)E" in report
+        assert "None" not in report and "nan" not in report
+
+    assert outputs["tsv"] == outputs["store"]
+    lines = outputs["tsv"].splitlines()
+    assert lines[1] == "测试纳斯达克100指数(QDII)A\t20.79%\t--\t16.54亿元（2025-06-30）\t100\t0.1\t0.6\t365"
+    assert lines[2] == "测试纳斯达克100指数(QDII)C\t20.31%\t--\t8.02亿元（2025-06-30）\t\t\t\t"
+    assert len(lines) == 4
+
+
+def test_truncated_cache_is_a_miss_without_streaming(tmp_path, monkeypatch):
+    monkeypatch.setattr(scraper, "CACHE_DIR", str(tmp_path))
+    with open(tmp_path / "900000.html", "w", encoding="utf-8") as f:
+        f.write("<html>partial" + scraper.TRUNCATED_MARKER)
+    requested = []
+
+    class FakeResponse:
+        text = read_fixture("900000")
+
+        def raise_for_status(self):
+            pass
+
+    def fake_get(url, **kwargs):
+        requested.append(url)
+        return FakeResponse()
+
+    monkeypatch.setattr(scraper.requests, "get", fake_get)
+
+    html, source = scraper.get_page_html("900000", streaming=True)
+    assert source == "cache" and html.endswith(scraper.TRUNCATED_MARKER)
+
+    html, source = scraper.get_page_html("900000", streaming=False)
+    assert source == "network" and "900001.html" in html
+    assert requested == ["http://fund.eastmoney.com/900000.html"]
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# staleness: 数据年龄取自每行的抓取时间，兄弟份额与快照中的行不应被标为“未知 (过期)”。
+import os
+import time
+import zipfile
+
+import pytest
+
+import scraper
+from cache_snapshot import Snapshot
+from fund_store import FundStore
+from staleness import fund_ages, stale_names
+from test_share_classes import CONFIG, read_fixture
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scraper.time, "sleep", lambda seconds: None)
+    return tmp_path
+
+
+def test_sibling_rows_have_fresh_ages(workdir, monkeypatch):
+    monkeypatch.setattr(scraper, "get_page_html", lambda fund_code, streaming=None: (read_fixture(fund_code), "network"))
+    records = scraper.scrape_for_config(CONFIG)
+
+    assert all(record["抓取时间"] for record in records)
+    ages = fund_ages(CONFIG)
+    assert set(ages) == {"测试纳斯达克100指数(QDII)A", "测试纳斯达克100指数(QDII)C", "测试纳斯达克100指数(QDII)E"}
+    assert all(age is not None and age < 60 for age in ages.values())
+    assert stale_names(CONFIG) == set()
+
+
+def test_snapshot_rows_use_packed_page_time(workdir, monkeypatch):
+    packed_at = (2025, 6, 30, 15, 0, 0)
+    with zipfile.ZipFile("snapshot.zip", "w") as zf:
+        for code in ("900000", "900002"):
+            zf.writestr(zipfile.ZipInfo(f"cache/{code}.html", date_time=packed_at), read_fixture(code))
+        zf.writestr("manifest.json", '{"created_at": "2025-06-30T15:00:00", "members": []}')
+    monkeypatch.setattr(scraper, "SNAPSHOT", Snapshot("snapshot.zip"))
+    monkeypatch.setattr(scraper, "CACHE_DIR", str(workdir / "cache"))
+
+    records = scraper.scrape_for_config(CONFIG)
+
+    assert [record["数据来源"] for record in records] == ["snapshot", "sibling:900000", "snapshot"]
+    assert {record["抓取时间"] for record in records} == {"2025-06-30T15:00:00"}
+    now = time.mktime(packed_at + (0, 0, -1)) + 120
+    assert all(age == pytest.approx(120) for age in fund_ages(CONFIG, now=now).values())
+    scraper.SNAPSHOT.close()
+
+
+def test_store_ages_from_updated_at(workdir):
+    with FundStore(os.path.join(workdir, "store.db")) as store:
+        store.sync_master(CONFIG)
+        store.upsert_dynamics([{"基金代码": "900001", "近一年": "20.31%", "近三年": "", "规模及日期": "8.02亿元",
+                                "抓取时间": "2025-06-30T15:00:00"}])
+        now = time.mktime(time.strptime("2025-06-30T16:00:00", scraper.FETCHED_AT_FORMAT))
+        ages = fund_ages(CONFIG, now=now, store=store)
+
+        assert ages["测试纳斯达克100指数(QDII)C"] == pytest.approx(3600)
+        assert ages["测试纳斯达克100指数(QDII)A"] is None
+        assert stale_names(CONFIG, store=store) == set(ages)
+
+
+def test_restored_pages_keep_packed_time(workdir):
+    packed_at = (2025, 6, 30, 15, 0, 0)
+    with zipfile.ZipFile("snapshot.zip", "w") as zf:
+        zf.writestr(zipfile.ZipInfo("cache/900000.html", date_time=packed_at), read_fixture("900000"))
+        zf.writestr("manifest.json", '{"created_at": "2025-06-30T15:00:00", "members": []}')
+    with Snapshot("snapshot.zip") as snapshot:
+        assert snapshot.restore(cache_dir="cache") == 1
+
+    assert os.path.getmtime(os.path.join("cache", "900000.html")) == time.mktime(packed_at + (0, 0, -1))
+    assert scraper._fetched_at("900000", "cache") == "2025-06-30T15:00:00"
+
+
+def test_failed_refresh_keeps_values_and_age(workdir, monkeypatch):
+    from combiner import combine_for_config
+
+    config = dict(CONFIG, target_file="test_fund_data.tsv")
+    with open(config["target_file"], "w", encoding="utf-8") as f:
+        f.write("名称\t一年涨幅(%)\t三年涨幅(%)\t规模(亿元)\t限额(元)\t买入费率(%)\t运作费率(年，%)\t零成本持有天数\n")
+    monkeypatch.setattr(scraper, "get_page_html", lambda fund_code, streaming=None: (read_fixture(fund_code), "network"))
+    combine_for_config(config, records=scraper.scrape_for_config(config))
+    with open(config["target_file"], encoding="utf-8") as f:
+        published = f.read()
+    ages = fund_ages(config, now=time.time() + 60)
+
+    monkeypatch.setattr(scraper, "get_page_html", lambda fund_code, streaming=None: (None, "网络请求错误: timeout"))
+    records = scraper.scrape_for_config(config)
+    assert all(record["近一年"].startswith("网络错误") for record in records)
+    combine_for_config(config, records=records, skip_failed=True)
+
+    with open(config["target_file"], encoding="utf-8") as f:
+        assert f.read() == published
+    assert fund_ages(config, now=time.time() + 60) == pytest.approx(ages, abs=2)